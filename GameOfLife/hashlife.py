@@ -0,0 +1,345 @@
+import numpy as np
+
+"""
+Hashlife: a quadtree representation of the matrix with memoized results, to advance Conway's Game of Life by 2^j generations at once.
+
+A node of level k represents a square of 2^k x 2^k cells, split into four nodes of level k-1 (a: upper-left, b: upper-right, c: lower-left, d: lower-right).
+Identical squares are shared, and the result of each node (its centre after 2^j generations) is computed once and kept in a cache.
+
+Two boundaries are available:
+    - torus: the matrix must be a square whose size is a power of two. The result is the same as with the other transition functions
+    - plane: the matrix is placed in an unbounded plane of dead cells, so patterns (e.g. gliders) can travel without coming back
+"""
+
+### Nodes
+class Node:
+    """
+    Node of level k: its four nodes of level k-1 (None for the leaves) and its number of living cells n.
+    The nodes built by join are unique, so they are hashed and compared by identity, without going down the quadtree.
+    """
+
+    __slots__ = ('k', 'a', 'b', 'c', 'd', 'n')
+
+    def __init__(self, k, a, b, c, d, n):
+        self.k, self.a, self.b, self.c, self.d, self.n = k, a, b, c, d, n
+
+# Leaves: a single dead or living cell
+off = Node(0, None, None, None, None, 0)
+on = Node(0, None, None, None, None, 1)
+
+# Caches of the nodes already built and of their results
+_join_cache = {}
+_successor_cache = {}
+
+
+def limit_cache(cache_size, keep=None):
+    """
+    Empty the caches if they hold more than cache_size entries. The nodes already built remain valid.
+    The empty nodes and the nodes of 'keep' stay in the cache of the nodes, so that the nodes built afterwards are shared with them.
+
+    Parameters:
+        cache_size (int): Maximum number of entries in each cache.
+        keep (Node optional): Node still in use (e.g. the current matrix).
+    """
+
+    if len(_join_cache) > cache_size or len(_successor_cache) > cache_size:
+        _join_cache.clear()
+        _successor_cache.clear()
+
+        nodes = list(get_zero.cache.values()) + ([keep] if keep is not None else [])
+        while nodes:
+            node = nodes.pop()
+            if node.k == 0 or (node.a, node.b, node.c, node.d) in _join_cache:
+                continue
+            _join_cache[(node.a, node.b, node.c, node.d)] = node
+            nodes.extend([node.a, node.b, node.c, node.d])
+
+
+def join(a, b, c, d):
+    """
+    Combine four nodes of level k-1 into a node of level k (identical nodes are shared).
+
+    Parameters:
+        a, b, c, d (Node): The upper-left, upper-right, lower-left and lower-right nodes.
+
+    Returns:
+        Node: The node of level k.
+    """
+
+    key = (a, b, c, d)
+    node = _join_cache.get(key)
+    if node is None:
+        node = Node(a.k + 1, a, b, c, d, a.n + b.n + c.n + d.n)
+        _join_cache[key] = node
+
+    return node
+
+
+def get_zero(k):
+    """
+    Return the node of level k holding only dead cells.
+    """
+
+    if k not in get_zero.cache:
+        get_zero.cache[k] = off if k == 0 else join(*[get_zero(k - 1)] * 4)
+
+    return get_zero.cache[k]
+
+get_zero.cache = {}
+
+
+def centre(node):
+    """
+    Return the central node of level k-1 of a node of level k.
+    """
+
+    return join(node.a.d, node.b.c, node.c.b, node.d.a)
+
+
+def expand(node):
+    """
+    Surround a node of level k with dead cells, returning a node of level k+1 with the same centre.
+    """
+
+    z = get_zero(node.k - 1)
+
+    return join(
+        join(z, z, z, node.a),
+        join(z, z, node.b, z),
+        join(z, node.c, z, z),
+        join(node.d, z, z, z),
+    )
+
+
+### Results
+def _life_4x4(node):
+    """
+    Compute the central 2x2 cells of a node of level 2 after one generation.
+    """
+
+    # Plain Python lists: numpy is slower than the interpreter on 16 cells
+    cells = [
+        [node.a.a.n, node.a.b.n, node.b.a.n, node.b.b.n],
+        [node.a.c.n, node.a.d.n, node.b.c.n, node.b.d.n],
+        [node.c.a.n, node.c.b.n, node.d.a.n, node.d.b.n],
+        [node.c.c.n, node.c.d.n, node.d.c.n, node.d.d.n],
+    ]
+
+    new_cells = []
+    for i, j in [(1, 1), (1, 2), (2, 1), (2, 2)]:
+        neighbours = sum(sum(row[j - 1:j + 2]) for row in cells[i - 1:i + 2]) - cells[i][j]
+        alive = neighbours == 3 or (cells[i][j] == 1 and neighbours == 2)
+        new_cells.append(on if alive else off)
+
+    return join(*new_cells)
+
+
+def successor(node, j=None):
+    """
+    Return the central node of level k-1 of a node of level k after 2^j generations.
+
+    Parameters:
+        node (Node): A node of level k >= 2.
+        j (int optional): Log2 of the number of generations, at most k-2. Default is k-2.
+
+    Returns:
+        Node: The central node of level k-1 after 2^j generations.
+    """
+
+    if j is None or j > node.k - 2:
+        j = node.k - 2
+
+    key = (node, j)
+    result = _successor_cache.get(key)
+    if result is not None:
+        return result
+
+    if node.n == 0:
+        result = node.a
+    elif node.k == 2:
+        result = _life_4x4(node)
+    else:
+        # Nine overlapping nodes of level k-1, each advanced to a node of level k-2
+        a, b, c, d = node.a, node.b, node.c, node.d
+        c1 = successor(a, j)
+        c2 = successor(join(a.b, b.a, a.d, b.c), j)
+        c3 = successor(b, j)
+        c4 = successor(join(a.c, a.d, c.a, c.b), j)
+        c5 = successor(centre(node), j)
+        c6 = successor(join(b.c, b.d, d.a, d.b), j)
+        c7 = successor(c, j)
+        c8 = successor(join(c.b, d.a, c.d, d.c), j)
+        c9 = successor(d, j)
+
+        if j < node.k - 2:
+            # The nine nodes are already 2^j generations ahead: keep their centres
+            result = join(
+                join(c1.d, c2.c, c4.b, c5.a),
+                join(c2.d, c3.c, c5.b, c6.a),
+                join(c4.d, c5.c, c7.b, c8.a),
+                join(c5.d, c6.c, c8.b, c9.a),
+            )
+        else:
+            # The nine nodes are 2^(k-3) generations ahead: advance them by 2^(k-3) more generations
+            result = join(
+                successor(join(c1, c2, c4, c5), j),
+                successor(join(c2, c3, c5, c6), j),
+                successor(join(c4, c5, c7, c8), j),
+                successor(join(c5, c6, c8, c9), j),
+            )
+
+    _successor_cache[key] = result
+
+    return result
+
+
+### Conversion from and to matrices
+def matrix_to_node(m, k=None):
+    """
+    Convert a binary matrix into a node, with the matrix in the upper-left corner.
+
+    Parameters:
+        m (numpy.ndarray): The input binary matrix.
+        k (int optional): Level of the node. Default is the smallest level holding the matrix (at least 2).
+
+    Returns:
+        Node: The node of level k.
+    """
+
+    m = np.asarray(m)
+    if k is None:
+        k = max(2, int(np.ceil(np.log2(max(m.shape)))))
+
+    padded = np.zeros((2 ** k, 2 ** k), dtype=np.uint8)
+    padded[:m.shape[0], :m.shape[1]] = m
+
+    def build(x, level):
+        if not x.any():
+            return get_zero(level)
+        if level == 0:
+            return on
+        half = x.shape[0] // 2
+        return join(
+            build(x[:half, :half], level - 1),
+            build(x[:half, half:], level - 1),
+            build(x[half:, :half], level - 1),
+            build(x[half:, half:], level - 1),
+        )
+
+    return build(padded, k)
+
+
+def _fill(node, m, i, j):
+    """
+    Write the living cells of a node whose upper-left corner is at position (i, j) of the matrix m, ignoring the cells outside of m.
+    """
+
+    size = 2 ** node.k
+    if node.n == 0 or i >= m.shape[0] or j >= m.shape[1] or i + size <= 0 or j + size <= 0:
+        return
+    if node.k == 0:
+        m[i, j] = 1
+        return
+
+    half = size // 2
+    _fill(node.a, m, i, j)
+    _fill(node.b, m, i, j + half)
+    _fill(node.c, m, i + half, j)
+    _fill(node.d, m, i + half, j + half)
+
+
+def node_to_matrix(node):
+    """
+    Convert a node into a binary matrix.
+
+    Parameters:
+        node (Node): A node of level k.
+
+    Returns:
+        numpy.ndarray: The binary matrix of shape (2^k, 2^k).
+    """
+
+    m = np.zeros((2 ** node.k, 2 ** node.k), dtype=int)
+    _fill(node, m, 0, 0)
+
+    return m
+
+
+### Advance by a number of generations
+def advance_torus(node, generations, cache_size=1000000):
+    """
+    Advance a node on a torus (the node is the whole matrix) by a number of generations.
+
+    Parameters:
+        node (Node): A node of level k >= 2 representing the matrix.
+        generations (int): Number of generations.
+        cache_size (int optional): Maximum number of entries in the caches. Default is 1 000 000.
+
+    Returns:
+        Node: The node of level k after the given number of generations.
+    """
+
+    while generations > 0:
+        limit_cache(cache_size, node)
+
+        # The centre of four copies of the matrix is the matrix shifted by half its size (periodic boundaries):
+        # advance it by at most 2^(k-1) generations, then shift it back
+        j = min(generations.bit_length() - 1, node.k - 1)
+        result = successor(join(node, node, node, node), j)
+        node = join(result.d, result.c, result.b, result.a)
+
+        generations -= 2 ** j
+
+    return node
+
+
+def advance_plane(node, generations, cache_size=1000000):
+    """
+    Advance a node in an unbounded plane of dead cells by a number of generations.
+    The returned node may have another level than the input node, but it has the same centre.
+
+    Parameters:
+        node (Node): A node of level k >= 2.
+        generations (int): Number of generations.
+        cache_size (int optional): Maximum number of entries in the caches. Default is 1 000 000.
+
+    Returns:
+        Node: A node with the same centre after the given number of generations.
+    """
+
+    j = 0
+    while generations > 0:
+        if generations & 1:
+            limit_cache(cache_size, node)
+
+            # Surround the pattern with enough dead cells to hold it after 2^j generations
+            while node.k < j + 2 or centre(centre(node)).n != node.n:
+                node = expand(node)
+            node = successor(node, j)
+
+        generations >>= 1
+        j += 1
+
+    return node
+
+
+def crop(node, k, shape):
+    """
+    Extract the window of the initial matrix from a node sharing the centre of the initial node.
+
+    Parameters:
+        node (Node): The current node.
+        k (int): Level of the initial node (see matrix_to_node).
+        shape (tuple): Shape (row, column) of the initial matrix.
+
+    Returns:
+        numpy.ndarray: The binary matrix of the given shape.
+    """
+
+    # Position of the upper-left corner of the current node relative to the initial one
+    offset = 2 ** (k - 1) - 2 ** (node.k - 1)
+
+    m = np.zeros(shape, dtype=int)
+    _fill(node, m, offset, offset)
+
+    return m
@@ -1,25 +1,140 @@
 from model import *
+from hashlife import matrix_to_node, node_to_matrix, advance_torus, advance_plane, crop
+from trajectory import TrajectoryWriter
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 import argparse
 import json
 
+### Transition functions available to update the matrix
+TRANSITIONS = {
+    'deepcopy': transition_deepcopy,
+    'fillmatrix': transition_fillmatrix,
+    'vectorized': transition_vectorized,
+}
+
+# Engines: the transition functions above, or boards stored in another representation
+ENGINES = list(TRANSITIONS) + ['sparse', 'bitpacked', 'hashlife', 'rule']
+
+def create_engine(m, engine='vectorized', jump=0, plane=False, rule=LIFE, boundary='torus'):
+    """
+    Create the board of an engine from the initial matrix
+
+    Parameters:
+        m (numpy.ndarray): The initial binary matrix.
+        engine (str optional): Engine used to update the board, one of ENGINES. Default is 'vectorized'.
+        jump (int optional): With the 'hashlife' engine, each update advances the board by 2^jump generations. Default is 0.
+        plane (bool optional): With the 'hashlife' engine, place the matrix in an unbounded plane of dead cells instead of a torus. Default is False.
+        rule (str optional): With the 'rule' engine, the rule in the B/S or Larger than Life notation (see transition_rule). Default is 'B3/S23'.
+        boundary (str optional): With the 'rule' engine, 'torus' or 'fixed' (the cells outside the matrix are dead). Default is 'torus'.
+
+    Returns:
+        tuple: A function updating the board (by one generation, or 2^jump with 'hashlife'), a function returning the current state as a binary matrix, and a dictionary of statistics updated by the engine ('active_fraction' of the tiles with 'sparse').
+
+    Raises:
+        ValueError: If the 'hashlife' engine is used on a torus with a matrix that is not a square whose size is a power of two (at least 4x4).
+        ValueError: If another rule than B3/S23 or fixed boundaries are used with another engine than 'rule'.
+    """
+
+    stats = {}
+
+    # Parse the rule once
+    rule = parse_rule(rule)
+    if engine != 'rule' and (rule != parse_rule(LIFE) or boundary != 'torus'):
+        raise ValueError('Only the rule engine applies other rules than B3/S23 or fixed boundaries. Use the rule engine instead.')
+
+    if engine == 'hashlife':
+        row, column = m.shape
+        if not plane and (row != column or row < 4 or row & (row - 1)):
+            raise ValueError('On a torus, hashlife needs a square matrix whose size is a power of two (at least 4x4). Use the plane instead.')
+
+        node = matrix_to_node(m)
+        k = node.k
+
+        def step():
+            nonlocal node
+            if plane:
+                node = advance_plane(node, 2 ** jump)
+            else:
+                node = advance_torus(node, 2 ** jump)
+
+        def view():
+            if plane:
+                return crop(node, k, (row, column))
+            return node_to_matrix(node)
+
+    elif engine == 'sparse':
+        active = None
+
+        def step():
+            nonlocal m, active
+            m, active = transition_sparse(m, active)
+            stats['active_fraction'] = active.mean()
+
+        def view():
+            return m
+
+    elif engine == 'rule':
+        def step():
+            nonlocal m
+            m = transition_rule(m, rule, boundary)
+
+        def view():
+            return m
+
+    elif engine == 'bitpacked':
+        column = m.shape[1]
+        board = pack_matrix(m)
+
+        def step():
+            nonlocal board
+            board = transition_bitpacked(board, column)
+
+        def view():
+            return unpack_matrix(board, column)
+
+    else:
+        transition = TRANSITIONS[engine]
+
+        def step():
+            nonlocal m
+            m = transition(m)
+
+        def view():
+            return m
+
+    return step, view, stats
+
 ### main function
-def main(matrix=None, size=(None, None), seed=None, time=100):
+def main(matrix=None, size=(None, None), seed=None, time=100, engine='vectorized', jump=0, plane=False, display=True, trajectory=None, keyframe=1, chunk=100, rule=LIFE, boundary='torus'):
     """
-    Create a matrix and update it according to Conway's Game of Life Rules
+    Create a matrix and update it according to Conway's Game of Life Rules, or to another outer-totalistic rule with the 'rule' engine
 
     Parameters:
         matrix (list optional): Input matrix. If provided, 'size' and 'seed' are ignored.
         size (tuple of ints, optional): Dimensions (rows, columns) of the matrix to create if 'matrix' is None.
         seed (int optional): Random seed for reproducibility when creating a new matrix.
         time (int optional): Number of frames / updates. Default is 100.
-
+        engine (str optional): Engine used to update the matrix. Takes 7 possible values: 'deepcopy', 'fillmatrix', 'vectorized', 'sparse', 'bitpacked', 'hashlife' or 'rule'. Default is 'vectorized'.
+        jump (int optional): With the 'hashlife' engine, each frame advances the matrix by 2^jump generations. Default is 0.
+        plane (bool optional): With the 'hashlife' engine, place the matrix in an unbounded plane of dead cells instead of a torus. Default is False.
+        display (bool optional): Show the animation. If False, the frames are only written to the trajectory file. Default is True.
+        trajectory (str optional): Name of the trajectory file (without extension) where the frames are streamed when display is False (see trajectory.py).
+        keyframe (int optional): Interval between two frames saved in the trajectory file, the others are computed again when they are read. Default is 1.
+        chunk (int optional): Number of frames kept in memory before they are flushed to the trajectory file. Default is 100.
+        rule (str optional): With the 'rule' engine, the rule in the B/S or Larger than Life notation, e.g. 'B36/S23' or 'R5,C2,M1,S34..58,B34..45,NM'. Default is 'B3/S23'.
+        boundary (str optional): With the 'rule' engine, 'torus' or 'fixed' (the cells outside the matrix are dead). Default is 'torus'.
 
     Returns:
-        matplotlib.animation.FuncAnimation: The animation object showing the evolution of the cellular automaton.
+        matplotlib.animation.FuncAnimation: The animation object showing the evolution of the cellular automaton (None if display is False).
+
+    Raises:
+        ValueError: If display is False and no trajectory file is given, or if the keyframe interval is greater than 1 with the 'hashlife' engine on the plane or with fixed boundaries.
     """
 
+    if not display and trajectory is None:
+        raise ValueError('Without display, a trajectory file is needed to save the frames.')
+
     # Verify or create the initial matrix
     if matrix is not None:
         m = verify_matrix(matrix) # use provided matrix
@@ -29,6 +144,19 @@ def main(matrix=None, size=(None, None), seed=None, time=100):
         row, column = size
         m = create_matrix(row, column, seed) # generate random matrix
 
+    step, view, stats = create_engine(m, engine, jump, plane, rule, boundary)
+
+    # Headless run: stream the initial state and each frame to the trajectory file
+    if not display:
+        generations = 2 ** jump if engine == 'hashlife' else 1
+        torus = not (engine == 'hashlife' and plane) and boundary == 'torus'
+        with TrajectoryWriter(trajectory, m.shape, time + 1, generations, keyframe, torus, chunk, rule) as writer:
+            writer.write(m)
+            for frame in range(time):
+                step()
+                writer.write(view())
+        return None
+
     # Create the figure and display the initial state
     fig, ax = plt.subplots()
     ax.set_axis_off()
@@ -36,9 +164,10 @@ def main(matrix=None, size=(None, None), seed=None, time=100):
 
     # Define the function to update the matrix for each frame
     def animate(frame):
-        nonlocal m
-        m = transition_deepcopy(m)
-        im.set_data(m)
+        step()
+        im.set_data(view())
+        if 'active_fraction' in stats:
+            ax.set_title(f"Active tiles: {stats['active_fraction']:.1%}")
         return [im]
 
     # Create the animation object
@@ -63,9 +192,30 @@ if __name__ == "__main__":
 
     parser.add_argument("--seed", type=int, help="Random seed for reproducibility")
     parser.add_argument("--time", type=int, default=100, help="Number of frames / updates. Default is 100")
+    parser.add_argument("--engine", type=str, choices=ENGINES, default='vectorized', help="Engine used to update the matrix. Default is 'vectorized'")
+    parser.add_argument("--jump", type=int, default=0, help="With the hashlife engine, each frame advances 2^jump generations. Default is 0")
+    parser.add_argument("--plane", action="store_true", help="With the hashlife engine, place the matrix in an unbounded plane of dead cells instead of a torus")
+    parser.add_argument("--rule", type=str, default=LIFE, help="With the rule engine, rule in the B/S or Larger than Life notation (e.g. 'B36/S23' or 'R5,C2,M1,S34..58,B34..45,NM'). Default is 'B3/S23'")
+    parser.add_argument("--boundary", type=str, choices=BOUNDARIES, default='torus', help="With the rule engine, boundary of the matrix: 'torus' or 'fixed' (dead cells outside). Default is 'torus'")
     parser.add_argument("--save", type=str, help="Save a gif animation under the given filename")
+    parser.add_argument("--no-display", action="store_true", help="Do not show the animation, only stream the frames to the trajectory file")
+    parser.add_argument("--trajectory", type=str, help="Name of the trajectory file (without extension) where the frames are streamed with --no-display")
+    parser.add_argument("--keyframe", type=int, default=1, help="Save one frame out of KEYFRAME in the trajectory file, the others are computed again when read. Default is 1")
+    parser.add_argument("--chunk", type=int, default=100, help="Number of frames kept in memory before they are written to the trajectory file. Default is 100")
     args = parser.parse_args()
 
+    if args.no_display and not args.trajectory:
+        parser.error('--no-display requires --trajectory')
+    if args.no_display and args.keyframe > 1 and ((args.engine == 'hashlife' and args.plane) or args.boundary == 'fixed'):
+        parser.error('--keyframe greater than 1 requires a torus (not --plane nor --boundary fixed)')
+
+    try:
+        rule = parse_rule(args.rule)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.engine != 'rule' and (rule != parse_rule(LIFE) or args.boundary != 'torus'):
+        parser.error('--rule and --boundary require --engine rule')
+
     size = tuple(args.size) if args.size else (None, None)
     if args.matrix:
         with open(args.matrix, 'r') as file:
@@ -73,9 +223,16 @@ if __name__ == "__main__":
     else:
         matrix = None
 
-    anim = main(matrix=matrix, size=size, seed=args.seed, time=args.time)
+    # On a torus, hashlife needs a square matrix whose size is a power of two
+    if args.engine == 'hashlife' and not args.plane:
+        row, column = np.shape(matrix) if matrix is not None else size
+        if row != column or row < 4 or row & (row - 1):
+            parser.error('the hashlife engine on a torus requires a square matrix whose size is a power of two (at least 4x4), use --plane otherwise')
+
+    anim = main(matrix=matrix, size=size, seed=args.seed, time=args.time, engine=args.engine, jump=args.jump, plane=args.plane,
+                display=not args.no_display, trajectory=args.trajectory, keyframe=args.keyframe, chunk=args.chunk, rule=args.rule, boundary=args.boundary)
     
-    if args.save:
+    if args.save and anim is not None:
         anim.save(args.save + '.gif', writer='PillowWriter', fps=10)
 
 
@@ -2,6 +2,12 @@ import numpy as np
 import numpy.random as random
 import matplotlib.pyplot as plt
 import copy
+import os
+import sys
+
+# Rules other than Conway's Game of Life are applied by the rule engine of the neighbouring folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'RuleEngine'))
+from rule_engine import LIFE, BOUNDARIES, parse_rule, transition
 
 ### Create a random binary matrix
 def create_matrix(row, column, seed=None):
@@ -139,4 +145,214 @@ def transition_fillmatrix(m):
             else:
                 matrix_update[i, j] = cell
 
-    return matrix_update
\ No newline at end of file
+    return matrix_update
+
+def transition_vectorized(m):
+    """
+    Update each cell of a cellular automaton according to Conway's Game of Life rules.
+    This implementation counts the living neighbours of all cells at once by shifting the whole matrix (periodic boundaries) instead of looping over the cells.
+
+    Parameters:
+        m (numpy.ndarray): The input binary matrix representing the cellular automaton.
+
+    Returns:
+        numpy.ndarray: The updated matrix after applying the transition rules.
+    """
+
+    # Count the number of living neighbours (8 surrounding cells, with periodic boundaries)
+    rows_shifted = m + np.roll(m, 1, axis=0) + np.roll(m, -1, axis=0)
+    neighbours = rows_shifted + np.roll(rows_shifted, 1, axis=1) + np.roll(rows_shifted, -1, axis=1) - m
+
+    # A cell is alive if it has 3 living neighbours, or if it is alive with 2 living neighbours
+    matrix_update = (neighbours == 3) | ((m == 1) & (neighbours == 2))
+
+    return matrix_update.astype(m.dtype)
+
+
+
+def transition_sparse(m, active=None, tile=32):
+    """
+    Update each cell of a cellular automaton according to Conway's Game of Life rules, recomputing only the active tiles of the matrix.
+    The matrix is split into tiles of tile x tile cells. A tile whose cells and neighbouring tiles did not change at the previous update cannot change, so only the other (active) tiles are recomputed.
+    When more than half of the tiles are active, the whole matrix is updated at once (see transition_vectorized).
+
+    Parameters:
+        m (numpy.ndarray): The input binary matrix representing the cellular automaton.
+        active (numpy.ndarray optional): Boolean matrix of the active tiles, as returned by the previous update. Default is None (all tiles are active).
+        tile (int optional): Size of the tiles. Default is 32.
+
+    Returns:
+        tuple: The updated matrix after applying the transition rules, and the boolean matrix of the tiles active at the next update.
+    """
+
+    row, column = m.shape
+    tile_row, tile_column = -(-row // tile), -(-column // tile)
+    if active is None:
+        active = np.ones((tile_row, tile_column), dtype=bool)
+
+    # When most tiles are active, update the whole matrix and find the tiles that changed
+    if active.mean() > 0.5:
+        m_update = transition_vectorized(m)
+        difference = np.zeros((tile_row * tile, tile_column * tile), dtype=bool)
+        difference[:row, :column] = m_update != m
+        changed = difference.reshape(tile_row, tile, tile_column, tile).any(axis=(1, 3))
+        ti = []
+    else:
+        m_update = m.copy()
+        changed = np.zeros((tile_row, tile_column), dtype=bool)
+        ti, tj = np.nonzero(active)
+
+    if len(ti):
+        # Rows and columns of each active tile with its surrounding cells (periodic boundaries)
+        r = ti[:, None] * tile + np.arange(-1, tile + 1)
+        c = tj[:, None] * tile + np.arange(-1, tile + 1)
+        blocks = m[(r % row)[:, :, None], (c % column)[:, None, :]]
+
+        # Count the number of living neighbours (8 surrounding cells) of the cells of each tile
+        rows_sum = blocks[:, :-2] + blocks[:, 1:-1] + blocks[:, 2:]
+        cells = blocks[:, 1:-1, 1:-1]
+        neighbours = rows_sum[:, :, :-2] + rows_sum[:, :, 1:-1] + rows_sum[:, :, 2:] - cells
+
+        # A cell is alive if it has 3 living neighbours, or if it is alive with 2 living neighbours
+        tiles_update = (neighbours == 3) | ((cells == 1) & (neighbours == 2))
+
+        # Write back the cells inside the matrix (the last tiles may be cut by the edges)
+        inside = (r[:, 1:-1] < row)[:, :, None] & (c[:, 1:-1] < column)[:, None, :]
+        rows_index = np.broadcast_to(r[:, 1:-1, None], inside.shape)[inside]
+        columns_index = np.broadcast_to(c[:, None, 1:-1], inside.shape)[inside]
+        m_update[rows_index, columns_index] = tiles_update[inside]
+
+        changed[ti, tj] = ((tiles_update != cells) & inside).any(axis=(1, 2))
+
+    # The tiles active at the next update are the changed tiles and their 8 surrounding tiles (periodic boundaries)
+    rows_active = changed | np.roll(changed, 1, axis=0) | np.roll(changed, -1, axis=0)
+    active_update = rows_active | np.roll(rows_active, 1, axis=1) | np.roll(rows_active, -1, axis=1)
+
+    return m_update, active_update
+
+### Outer-totalistic rules
+def transition_rule(m, rule=LIFE, boundary='torus'):
+    """
+    Update each cell of a cellular automaton according to any outer-totalistic rule, e.g. 'B36/S23' (HighLife) or 'R5,C2,M1,S34..58,B34..45,NM' (Bosco's rule).
+    The living neighbours of Moore or von Neumann neighbourhoods of any radius are counted by the rule engine (see RuleEngine/rule_engine.py) with separable sums.
+
+    Parameters:
+        m (numpy.ndarray): The input binary matrix representing the cellular automaton.
+        rule (str or dict optional): The rule in the B/S or Larger than Life notation, or read by parse_rule. Default is Conway's Game of Life 'B3/S23'.
+        boundary (str optional): 'torus' (periodic boundaries) or 'fixed' (the cells outside the matrix are dead). Default is 'torus'.
+
+    Returns:
+        numpy.ndarray: The updated matrix after applying the rule.
+    """
+
+    return transition(m, rule, boundary)
+
+### Bit-packed board: 64 cells per word
+"""
+The matrix can also be stored as a bit-packed board: a uint64 array of shape (row, ceil(column / 64)) where the cell (i, j) is the bit j % 64 of the word (i, j // 64).
+The next generation is then computed on whole words with bitwise operations, 64 cells at a time.
+"""
+
+def pack_matrix(m):
+    """
+    Convert a binary matrix into a bit-packed board.
+
+    Parameters:
+        m (numpy.ndarray): The input binary matrix.
+
+    Returns:
+        numpy.ndarray: uint64 board of shape (row, ceil(column / 64)).
+    """
+
+    row, column = m.shape
+    words = -(-column // 64)
+
+    padded = np.zeros((row, words * 64), dtype=np.uint8)
+    padded[:, :column] = m
+
+    return np.packbits(padded, axis=1, bitorder='little').view('<u8').astype(np.uint64)
+
+
+def unpack_matrix(board, column):
+    """
+    Convert a bit-packed board back into a binary matrix.
+
+    Parameters:
+        board (numpy.ndarray): The bit-packed board.
+        column (int): The number of columns of the matrix.
+
+    Returns:
+        numpy.ndarray: The binary matrix of shape (row, column).
+    """
+
+    packed = np.ascontiguousarray(board, dtype='<u8').view(np.uint8)
+
+    return np.unpackbits(packed, axis=1, count=column, bitorder='little').astype(int)
+
+
+def _full_adder(a, b, c):
+    """
+    Add three bit-packed boards bit by bit.
+
+    Returns:
+        tuple: the sum bits and the carry bits.
+    """
+
+    partial = a ^ b
+
+    return partial ^ c, (a & b) | (partial & c)
+
+
+def transition_bitpacked(board, column, band=1024):
+    """
+    Update each cell of a bit-packed board according to Conway's Game of Life rules.
+    The living neighbours are counted with bitwise full adders on whole words (periodic boundaries). The rows are processed by bands to bound the memory used.
+
+    Parameters:
+        board (numpy.ndarray): The input bit-packed board (see pack_matrix).
+        column (int): The number of columns of the matrix.
+        band (int optional): Number of rows processed at once. Default is 1024.
+
+    Returns:
+        numpy.ndarray: The updated bit-packed board after applying the transition rules.
+    """
+
+    row, words = board.shape
+    board_update = np.empty_like(board)
+
+    # Position of the last column in the last word
+    last = np.uint64((column - 1) % 64)
+
+    for start in range(0, row, band):
+        end = min(start + band, row)
+
+        # Rows of the band with the row above and the row below (periodic boundaries)
+        x = board[np.arange(start - 1, end + 1) % row]
+
+        # State of the left neighbour of each cell: shift each word by one bit, carrying the last bit of the previous word
+        carry = np.roll(x >> np.uint64(63), 1, axis=1)
+        carry[:, 0] = (x[:, -1] >> last) & np.uint64(1)
+        left = (x << np.uint64(1)) | carry
+
+        # State of the right neighbour of each cell: shift each word by one bit, carrying the first bit of the next word
+        carry = np.roll(x & np.uint64(1), -1, axis=1) << np.uint64(63)
+        carry[:, -1] = (x[:, 0] & np.uint64(1)) << last
+        right = (x >> np.uint64(1)) | carry
+
+        # Count the number of living neighbours (8 surrounding cells) as binary digits: ones, twos and fours
+        s1, c1 = _full_adder(left[:-2], x[:-2], right[:-2])
+        s2, c2 = _full_adder(left[1:-1], right[1:-1], left[2:])
+        s3, c3 = x[2:] ^ right[2:], x[2:] & right[2:]
+        ones, c4 = _full_adder(s1, s2, s3)
+        t, fours = _full_adder(c1, c2, c3)
+        twos = t ^ c4
+        fours = fours | (t & c4)
+
+        # A cell is alive if it has 3 living neighbours, or if it is alive with 2 living neighbours
+        board_update[start:end] = twos & ~fours & (ones | x[1:-1])
+
+    # Clear the unused bits of the last word
+    if column % 64:
+        board_update[:, -1] &= np.uint64((1 << (column % 64)) - 1)
+
+    return board_update
\ No newline at end of file
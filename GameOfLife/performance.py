@@ -1,32 +1,284 @@
 from model import *
+from main import ENGINES, create_engine
+import os
+import sys
 import timeit
+import hashlife
+import tracemalloc
+import platform
+import datetime
+import argparse
+import json
 import numpy as np
 
+# The genetic algorithm functions are benchmarked from the neighbouring folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'GeneticAlgorithm'))
+import automaton_fitness
+import encode as encoding
+import selection as select
+import crossover as cross
+import mutation as mutate
+import genetic_algorithm as ga
+
 """
-Performance comparison of two matrix update functions used in the main script.
-Both functions apply Conway's Game of Life rules to update a matrix:
-    - transition_deepcopy: updates the matrix using a deepcopy of the original
-    - transition_fillmatrix: creates an empty matrix and fill it based on the origin
+Benchmark suite of the functions updating cellular automata and of the genetic algorithm.
+Each benchmark is measured on a grid of matrix sizes (and population sizes for the genetic algorithm):
+    - life: the engines of main.py (deepcopy, fillmatrix, vectorized, sparse, bitpacked, hashlife and rule), one generation of the same random matrix per call,
+      and the rule engine on Larger than Life rules of radius 2 and 5. Each call updates a new board built from the matrix (with an empty hashlife cache),
+      outside the measured time
+    - ga: the reference and lookup transitions of both encodings, fitness, population fitness, selection, crossover, mutation and a full generation
+For each benchmark, the best time per call, the throughput (cells updated per second, or genes / rules per second for the genetic operators)
+and the peak memory allocated during one call are reported. The results can be saved to a JSON file and compared to a previous one.
 """
 
-# Create a random binary matrix for the test.
-# Fix the seed for reproducibility.
-M=create_matrix(100, 100, seed=885)
+### Measurement
+def measure(func, rep=3, setup=None):
+    """
+    Measure the time and peak memory of a function.
+
+    Parameters:
+        func (function): Function without arguments.
+        rep (int optional): Number of repetitions of the measurement. Default is 3.
+        setup (function optional): Function without arguments returning a new function to measure for each call, built outside the measured time
+            (for functions updating a state). If given, func is not used. Default is None.
+
+    Returns:
+        tuple: Best time per call (s) over the repetitions, and peak memory allocated during one call (bytes).
+    """
+
+    if setup is None:
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        seconds = min(timer.repeat(repeat=rep, number=number)) / number
+
+    # Each call on a new state: the calls of a repetition are timed one by one, until they last 0.2 s like autorange
+    else:
+        seconds = float('inf')
+        for _ in range(rep):
+            total, number = 0, 0
+            while total < 0.2:
+                func = setup()
+                start = timeit.default_timer()
+                func()
+                total += timeit.default_timer() - start
+                number += 1
+            seconds = min(seconds, total / number)
+        func = setup()
+
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return seconds, peak
+
+
+def result(name, size, population, seconds, peak, amount, unit):
+    return {
+        'name': name,
+        'size': size,
+        'population': population,
+        'seconds': seconds,
+        'rate': amount / seconds,
+        'unit': unit,
+        'peak_memory': peak,
+    }
+
+
+### Benchmarks
+# Larger than Life rules of the rule engine: the cost of the separable sums grows with the radius
+LARGER_RULES = {2: 'R2,C2,M1,S7..12,B8..10,NM', 5: 'R5,C2,M1,S34..58,B34..45,NM'}
+
+def new_step(M, engine, **options):
+    """
+    Return the function updating a new board of the engine, built from a copy of the matrix. The hashlife cache is emptied first,
+    so that the generation is computed instead of being read from the squares remembered by the previous boards.
+    """
+
+    if engine == 'hashlife':
+        hashlife.limit_cache(0)
+
+    return create_engine(M.copy(), engine, **options)[0]
+
+
+def benchmark_life(engines, sizes, rep=3):
+    """
+    Benchmark one generation of each engine of main.py on random square matrices, each call updating a new board built from the matrix.
+
+    Parameters:
+        engines (list): Engines to benchmark (see main.ENGINES).
+        sizes (list): Sizes of the square matrices.
+        rep (int optional): Number of repetitions of the measurement. Default is 3.
+
+    Returns:
+        list: One result (dict) per engine and size.
+    """
+
+    results = []
+    for size in sizes:
+        M = create_matrix(size, size, seed=885)
+        for engine in engines:
+            # The hashlife torus only accepts sizes that are powers of two
+            if engine == 'hashlife' and size & (size - 1):
+                continue
+            seconds, peak = measure(None, rep, setup=lambda: new_step(M, engine))
+            results.append(result(f'life/{engine}', size, None, seconds, peak, size * size, 'cells/s'))
+            print_result(results[-1])
+
+            if engine == 'rule':
+                for radius, rule in LARGER_RULES.items():
+                    seconds, peak = measure(None, rep, setup=lambda: new_step(M, engine, rule=rule))
+                    results.append(result(f'life/rule_R{radius}', size, None, seconds, peak, size * size, 'cells/s'))
+                    print_result(results[-1])
+
+    return results
+
+
+def benchmark_ga(sizes, populations, time=100, rep=3):
+    """
+    Benchmark the functions of the genetic algorithm.
+
+    Parameters:
+        sizes (list): Sizes of the square initial matrices.
+        populations (list): Population sizes.
+        time (int optional): Number of iterations of each simulation. Default is 100.
+        rep (int optional): Number of repetitions of the measurement. Default is 3.
+
+    Returns:
+        list: One result (dict) per benchmark, size and population size.
+    """
+
+    results = []
+
+    def run(name, size, population, func, amount, unit):
+        np.random.seed(885)
+        seconds, peak = measure(func, rep)
+        results.append(result(name, size, population, seconds, peak, amount, unit))
+        print_result(results[-1])
+
+    np.random.seed(885)
+    genomes = {encode: encoding.Genome(encode, max(populations)) for encode in ['living', 'pattern']}
+    reference = {'living': automaton_fitness.CellularAutomaton_living, 'pattern': automaton_fitness.CellularAutomaton_pattern}
+
+    # Simulations and fitness
+    for size in sizes:
+        M = automaton_fitness.create_matrix(size, size, seed=70)
+        cells = size * size * time
+
+        for encode in ['living', 'pattern']:
+            rule = encoding.genome_to_rule(genomes[encode][0], encode)
+            run(f'ga/{encode}_reference', size, None, lambda: reference[encode](rule, M, time), cells, 'cells/s')
+            run(f'ga/{encode}_lookup', size, None, lambda: automaton_fitness.CellularAutomaton_lookup(genomes[encode][0], M, encode, time), cells, 'cells/s')
+
+        run('ga/fitness', size, None, lambda: automaton_fitness.fitness(M), size * size, 'cells/s')
+
+        for N in populations:
+            for encode in ['living', 'pattern']:
+                tables = genomes[encode][:N]
+                run(f'ga/population_fitness_{encode}', size, N, lambda: automaton_fitness.population_fitness(tables, M, encode, time), N * cells, 'cells/s')
+
+                # A new cache for each call, so that all rules are simulated
+                def generation():
+                    cache = ga.FitnessCache()
+                    scores = ga.evaluate_population(tables, M, encode, cache, time=time)
+                    ga.next_generation(tables, scores, 'tournament', '2p', 0.1, min(4, N), N)
+                run(f'ga/generation_{encode}', size, N, generation, N * cells, 'cells/s')
+
+    # Genetic operators, on pattern genomes (512 genes)
+    scores = np.random.random(max(populations)) * 100
+    for N in populations:
+        population = genomes['pattern'][:N]
+        genes = population.size
+
+        for method in ['random', 'best', 'weighted', 'tournament']:
+            func = getattr(select, f'select_{method}')
+            run(f'ga/selection_{method}', None, N, lambda: func(scores[:N], min(4, N)), N, 'rules/s')
+
+        for method in ['half', 'random_1p', 'random_2p']:
+            func = getattr(cross, f'crossover_{method}')
+            run(f'ga/crossover_{method}', None, N, lambda: func(population, np.roll(population, 1, axis=0)), genes, 'genes/s')
+
+        run('ga/mutation', None, N, lambda: mutate.mutation(population.copy(), 0.1), genes, 'genes/s')
+
+    return results
+
+
+### Results
+def label(r):
+    grid = [] if r['size'] is None else [f"size {r['size']}"]
+    grid += [] if r['population'] is None else [f"N {r['population']}"]
+    return f"[{r['name']}] {', '.join(grid)}"
+
+
+def print_result(r):
+    print(f"{label(r)}: {r['seconds'] * 1000:.3f} ms per call, {r['rate']:.3g} {r['unit']}, peak memory {r['peak_memory'] / 1024:.0f} KiB")
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Compare results with a baseline and flag the regressions.
+
+    Parameters:
+        results (list): The current results.
+        baseline (list): The results of the baseline (same format).
+        tolerance (float optional): Relative slowdown tolerated before a benchmark is flagged. Default is 0.2.
+
+    Returns:
+        list: The names, sizes and population sizes of the regressions.
+    """
 
-# Parameters for the performance test
-rep = 5  # Number of repetitions of the measurement
-N = 10000 # Number of executions per repetition
+    reference = {(r['name'], r['size'], r['population']): r for r in baseline}
+    regressions = []
+    for r in results:
+        key = (r['name'], r['size'], r['population'])
+        if key not in reference:
+            continue
 
-# Measure performance of transition deepcopy
-time_deepcopy = timeit.repeat(lambda: transition_deepcopy(M), repeat=rep, number=N)
-print(f"[deepcopy] Average time over {rep} runs of {N} executions: {round(np.mean(time_deepcopy), 2)} s")
+        ratio = r['seconds'] / reference[key]['seconds']
+        flag = ratio > 1 + tolerance
+        if flag:
+            regressions.append(key)
+        print(f"{label(r)}: {ratio:.2f}x the baseline time{' REGRESSION' if flag else ''}")
 
+    return regressions
 
-# Measure performance of transition_fillmatrix
-time_fillmatrix = timeit.repeat(lambda: transition_fillmatrix(M), repeat=rep, number=N)
-print(f"[fillmatrix] Average time over {rep} runs of {N} executions: {round(np.mean(time_fillmatrix), 2)} s")
 
+### Parse the arguments
+if __name__ == "__main__":
 
+    parser = argparse.ArgumentParser(description='Benchmark the cellular automata and the genetic algorithm')
+    parser.add_argument("--suite", nargs='+', type=str, choices=['life', 'ga'], default=['life', 'ga'], help="Benchmarks to run. Default is both")
+    parser.add_argument("--engine", nargs='+', type=str, choices=ENGINES, default=ENGINES, help="Engines benchmarked in the life suite. Default is all of them")
+    parser.add_argument("--size", nargs='+', type=int, default=[64, 256, 1024], help="Sizes of the square matrices of the life suite. Default is 64 256 1024")
+    parser.add_argument("--ga-size", nargs='+', type=int, default=[50, 100], help="Sizes of the square matrices of the ga suite. Default is 50 100")
+    parser.add_argument("--population", nargs='+', type=int, default=[10, 100], help="Population sizes of the ga suite. Default is 10 100")
+    parser.add_argument("--time", type=int, default=100, help="Number of iterations of the ga simulations. Default is 100")
+    parser.add_argument("--rep", type=int, default=3, help="Number of repetitions of each measurement. Default is 3")
+    parser.add_argument("--output", type=str, help="Save the results to this JSON file")
+    parser.add_argument("--baseline", type=str, help="Compare the results with this JSON file and flag the regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Relative slowdown tolerated before a regression is flagged. Default is 0.2")
+    args = parser.parse_args()
 
+    results = []
+    if 'life' in args.suite:
+        results += benchmark_life(args.engine, args.size, args.rep)
+    if 'ga' in args.suite:
+        results += benchmark_ga(args.ga_size, args.population, args.time, args.rep)
 
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({
+                'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'machine': platform.platform(),
+                'results': results,
+            }, file, indent=4)
 
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        print(f'{len(regressions)} regression(s) beyond {args.tolerance:.0%}')
+        if regressions:
+            sys.exit(1)
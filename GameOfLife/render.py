@@ -0,0 +1,65 @@
+from trajectory import TrajectoryReader
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.animation import FuncAnimation, PillowWriter, FFMpegWriter
+import argparse
+
+### Writers available for each type of output file
+WRITERS = {
+    '.gif': PillowWriter,
+    '.mp4': FFMpegWriter,
+}
+
+### render function
+def render(trajectory, output, fps=10, start=0, stop=None, every=1):
+    """
+    Build an animation from a trajectory file written by main.py, reading one frame at a time.
+
+    Parameters:
+        trajectory (str): Name of the trajectory file (without extension).
+        output (str): Name of the animation file, ending with '.gif' or '.mp4'.
+        fps (int optional): Frames per second of the animation. Default is 10.
+        start (int optional): First frame of the trajectory to render. Default is 0.
+        stop (int optional): Frame of the trajectory where the rendering stops (excluded). Default is the last frame.
+        every (int optional): Render one frame out of 'every'. Default is 1.
+
+    Raises:
+        ValueError: If the extension of the output file is not supported.
+    """
+
+    extension = output[output.rfind('.'):].lower()
+    if extension not in WRITERS:
+        raise ValueError(f'Unsupported output file {output}. Use one of: {", ".join(WRITERS)}.')
+
+    reader = TrajectoryReader(trajectory)
+    count = len(range(start, len(reader) if stop is None else min(stop, len(reader)), every))
+
+    # Create the figure, the frames are set by animate
+    fig, ax = plt.subplots()
+    ax.set_axis_off()
+    im = ax.imshow(reader.frame(start), cmap="Greys", vmin=0, vmax=1)
+
+    def animate(frame):
+        i, m = frame
+        im.set_data(m)
+        ax.set_title(f"Generation {i * reader.generations}")
+        return [im]
+
+    anim = FuncAnimation(fig, animate, frames=reader.iter_frames(start, stop, every), save_count=count, cache_frame_data=False)
+    anim.save(output, writer=WRITERS[extension](fps=fps))
+    plt.close(fig)
+
+### Parse the arguments
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Render a Game of Life trajectory file as an animation')
+    parser.add_argument("trajectory", type=str, help="Name of the trajectory file (without extension)")
+    parser.add_argument("output", type=str, help="Name of the animation file, ending with .gif or .mp4 (mp4 needs ffmpeg)")
+    parser.add_argument("--fps", type=int, default=10, help="Frames per second. Default is 10")
+    parser.add_argument("--start", type=int, default=0, help="First frame to render. Default is 0")
+    parser.add_argument("--stop", type=int, help="Frame where the rendering stops (excluded). Default is the last frame")
+    parser.add_argument("--every", type=int, default=1, help="Render one frame out of EVERY. Default is 1")
+    args = parser.parse_args()
+
+    render(args.trajectory, args.output, fps=args.fps, start=args.start, stop=args.stop, every=args.every)
@@ -0,0 +1,282 @@
+from model import pack_matrix, unpack_matrix, transition_bitpacked, transition_rule, parse_rule, LIFE
+import numpy as np
+import argparse
+import json
+
+"""
+Trajectory files: the successive states of a cellular automaton saved on disk, so that a run does not have to be displayed while it is computed.
+A trajectory named 'run' is stored in three files:
+    - run.npy: the keyframes (one frame out of 'keyframe'), bit-packed (8 cells per byte), in a memory-mapped array of shape (keyframes, row, ceil(column / 8))
+    - run_population.npy: the number of living cells of every frame
+    - run.json: the description of the trajectory (size of the matrix, number of frames written, generations between two frames, keyframe interval, boundary, rule)
+The frames between two keyframes are computed again from the previous keyframe when they are read, with the bit-packed transition for Conway's Game of Life
+and with the rule engine for the other rules (see transition_rule).
+"""
+
+class TrajectoryWriter:
+    """
+    Stream the frames of a run to a trajectory file, keeping only the frames not yet flushed in memory.
+
+    Parameters:
+        path (str): Name of the trajectory (without extension).
+        shape (tuple): Shape (row, column) of the matrix.
+        frames (int): Maximum number of frames.
+        generations (int optional): Number of generations between two frames. Default is 1.
+        keyframe (int optional): Interval between two saved frames. Default is 1 (every frame is saved).
+        torus (bool optional): Whether the matrix is a torus. The frames of other boundaries cannot be computed again, so every frame must be saved. Default is True.
+        chunk (int optional): Number of frames written before flushing them to disk. Default is 100.
+        rule (str optional): Rule of the automaton, used to compute the frames between two keyframes again. Default is 'B3/S23'.
+
+    Raises:
+        ValueError: If the keyframe interval is greater than 1 and the matrix is not a torus, or if the rule cannot be read.
+    """
+
+    def __init__(self, path, shape, frames, generations=1, keyframe=1, torus=True, chunk=100, rule=LIFE):
+        if keyframe > 1 and not torus:
+            raise ValueError('Only the frames of a torus can be computed again from keyframes. Use a keyframe interval of 1.')
+        parse_rule(rule)
+
+        self.path = path
+        self.shape = tuple(shape)
+        self.generations = generations
+        self.keyframe = keyframe
+        self.torus = torus
+        self.chunk = chunk
+        self.rule = rule
+        self.count = 0
+
+        row, column = self.shape
+        self.keyframes = np.lib.format.open_memmap(path + '.npy', mode='w+', dtype=np.uint8, shape=(-(-frames // keyframe), row, -(-column // 8)))
+        self.population = np.lib.format.open_memmap(path + '_population.npy', mode='w+', dtype=np.int64, shape=(frames,))
+
+    def write(self, m):
+        """
+        Append a frame to the trajectory.
+
+        Parameters:
+            m (numpy.ndarray): The binary matrix of the frame.
+        """
+
+        if self.count % self.keyframe == 0:
+            self.keyframes[self.count // self.keyframe] = np.packbits(m, axis=-1)
+        self.population[self.count] = np.count_nonzero(m)
+        self.count += 1
+
+        if self.count % self.chunk == 0:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the frames to disk and update the description of the trajectory.
+        """
+
+        self.keyframes.flush()
+        self.population.flush()
+        meta = {
+            'row': self.shape[0],
+            'column': self.shape[1],
+            'frames': self.count,
+            'generations': self.generations,
+            'keyframe': self.keyframe,
+            'torus': self.torus,
+            'rule': self.rule,
+        }
+        with open(self.path + '.json', 'w') as file:
+            json.dump(meta, file, indent=4)
+
+    def close(self):
+        self.flush()
+        del self.keyframes, self.population
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class TrajectoryReader:
+    """
+    Random access to the frames of a trajectory file, without loading it in memory.
+
+    Parameters:
+        path (str): Name of the trajectory (without extension).
+    """
+
+    def __init__(self, path):
+        with open(path + '.json', 'r') as file:
+            meta = json.load(file)
+
+        self.row = meta['row']
+        self.column = meta['column']
+        self.frames = meta['frames']
+        self.generations = meta['generations']
+        self.keyframe = meta['keyframe']
+        self.torus = meta['torus']
+
+        # Trajectories written before the rule was saved follow Conway's Game of Life
+        self.rule = parse_rule(meta.get('rule', LIFE))
+        self.life = self.rule == parse_rule(LIFE)
+
+        self.keyframes = np.load(path + '.npy', mmap_mode='r')
+        self.population = np.load(path + '_population.npy', mmap_mode='r')[:self.frames]
+
+    def __len__(self):
+        return self.frames
+
+    def _advance(self, board, frames):
+        """
+        Advance a bit-packed board by a number of frames.
+        """
+
+        if self.life:
+            for _ in range(frames * self.generations):
+                board = transition_bitpacked(board, self.column)
+            return board
+
+        # The other rules are applied to the binary matrix by the rule engine
+        if frames == 0:
+            return board
+        m = unpack_matrix(board, self.column)
+        for _ in range(frames * self.generations):
+            m = transition_rule(m, self.rule)
+
+        return pack_matrix(m)
+
+    def frame(self, i):
+        """
+        Return a frame, computed from the nearest keyframe before it.
+
+        Parameters:
+            i (int): Index of the frame.
+
+        Returns:
+            numpy.ndarray: The binary matrix of the frame.
+
+        Raises:
+            IndexError: If the frame is not in the trajectory.
+        """
+
+        if not 0 <= i < self.frames:
+            raise IndexError(f'Frame {i} is not in the trajectory ({self.frames} frames).')
+
+        board = pack_matrix(unpack_frame(self.keyframes[i // self.keyframe], self.column))
+        board = self._advance(board, i % self.keyframe)
+
+        return unpack_matrix(board, self.column)
+
+    def generation(self, g):
+        """
+        Return the state of the matrix at a given generation.
+
+        Parameters:
+            g (int): The generation, a multiple of the number of generations between two frames.
+
+        Returns:
+            numpy.ndarray: The binary matrix at generation g.
+
+        Raises:
+            ValueError: If the generation was not recorded in the trajectory.
+        """
+
+        if g % self.generations:
+            raise ValueError(f'Generation {g} was not recorded: the trajectory holds one frame every {self.generations} generations.')
+
+        return self.frame(g // self.generations)
+
+    def iter_frames(self, start=0, stop=None, every=1):
+        """
+        Iterate over the frames, computing each frame from the previous one instead of going back to the keyframe.
+
+        Parameters:
+            start (int optional): First frame. Default is 0.
+            stop (int optional): Frame where the iteration stops (excluded). Default is the last frame.
+            every (int optional): Return one frame out of 'every'. Default is 1.
+
+        Yields:
+            tuple: The index of the frame and its binary matrix.
+        """
+
+        stop = self.frames if stop is None else min(stop, self.frames)
+        if start >= stop:
+            return
+
+        board = pack_matrix(self.frame(start))
+        i = start
+        while i < stop:
+            yield i, unpack_matrix(board, self.column)
+
+            # Jump to the keyframe when it is closer than the next frame
+            target = i + every
+            if target < stop:
+                if target // self.keyframe > i // self.keyframe:
+                    board = pack_matrix(unpack_frame(self.keyframes[target // self.keyframe], self.column))
+                    board = self._advance(board, target % self.keyframe)
+                else:
+                    board = self._advance(board, every)
+            i = target
+
+    def statistics(self, chunk=100000):
+        """
+        Compute statistics of the population over all frames, reading the population counts chunk by chunk.
+
+        Parameters:
+            chunk (int optional): Number of frames read at once. Default is 100 000.
+
+        Returns:
+            dict: Number of frames, and minimum, maximum, mean and standard deviation of the population, and final population (None without frames).
+        """
+
+        if self.frames == 0:
+            return {'frames': 0, 'min': None, 'max': None, 'mean': None, 'std': None, 'final': None}
+
+        total, total_squared = 0.0, 0.0
+        minimum, maximum = np.inf, -np.inf
+        for begin in range(0, self.frames, chunk):
+            population = np.asarray(self.population[begin:begin + chunk], dtype=float)
+            total += population.sum()
+            total_squared += (population ** 2).sum()
+            minimum = min(minimum, population.min())
+            maximum = max(maximum, population.max())
+
+        mean = total / self.frames
+        return {
+            'frames': self.frames,
+            'min': int(minimum),
+            'max': int(maximum),
+            'mean': float(mean),
+            'std': float(np.sqrt(max(total_squared / self.frames - mean ** 2, 0.0))),
+            'final': int(self.population[-1]),
+        }
+
+
+def unpack_frame(packed, column):
+    """
+    Convert a bit-packed frame back into a binary matrix.
+
+    Parameters:
+        packed (numpy.ndarray): The bit-packed frame.
+        column (int): The number of columns of the matrix.
+
+    Returns:
+        numpy.ndarray: The binary matrix of the frame.
+    """
+
+    return np.unpackbits(packed, axis=-1, count=column).astype(int)
+
+### Parse the arguments
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Inspect a Game of Life trajectory file')
+    parser.add_argument("trajectory", type=str, help="Name of the trajectory file (without extension)")
+    parser.add_argument("--generation", type=int, help="Save the matrix at this generation")
+    parser.add_argument("--output", type=str, default='generation.json', help="JSON file where the matrix is saved (usable with main.py -m). Default is 'generation.json'")
+    args = parser.parse_args()
+
+    reader = TrajectoryReader(args.trajectory)
+    for key, value in reader.statistics().items():
+        print(f'{key}: {value}')
+
+    if args.generation is not None:
+        with open(args.output, 'w') as file:
+            json.dump(reader.generation(args.generation).tolist(), file)
@@ -1,20 +1,160 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
 from genetic_algorithm import *
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import itertools
+import pandas as pd
+
+"""
+Parameter sweep of the genetic algorithm: test the effect of the parameters on the performance of the algorithm.
+The runs are built from a grid of parameter values (or a random sample of this grid), repeated with several replicate seeds,
+and spread over a pool of processes (one run per process). A run whose results already exist is not run again, so an interrupted sweep can be restarted.
+The runs share a fitness cache saved in the results folder, so that the rules already evaluated by a run (or by a previous sweep) are not simulated again.
+All runs are then summarised in a single table (one row per run).
+"""
+
+# Parameters of a run, with the default values of the sweep
+PARAMETERS = {
+    'encode': ['living'],    # ['living', 'pattern']
+    'selection': ['random', 'best', 'weighted', 'tournament'],
+    'crossover': ['half'],    # ['half', '1p', '2p']
+    'mutation': [0.1],    # [0.01, 0.05, 0.1, 0.5]
+    'n_select': [4],    # [2, 4, 6]
+    'N': [10],
+}
+
+### Runs
+def sweep_runs(grid, replicates=1, sample=None, seed=0, generation=10):
+    """
+    List the runs of a sweep.
+
+    Parameters:
+        - grid (dict): values of each parameter (see PARAMETERS)
+        - replicates (int, optional): number of runs of each set of parameters. Default = 1
+        - sample (int, optional): number of sets of parameters drawn at random from the grid. Default = all the sets of the grid
+        - seed (int, optional): seed of the sample and of the replicates. Default = 0
+        - generation (int, optional): number of generations of each run. Default = 10
+
+    Return:
+        list: one dict of parameters per run, with its number of generations, replicate number, seed and output name
+              (<encode>_<selection>_<crossover>_m<mutation>_p<n_select>_N<N>_g<generation>_rep<replicate>, read by run_analysis.py)
+    """
+    names = list(grid)
+    configurations = [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+    # The parents are selected among the population
+    configurations = [c for c in configurations if c['n_select'] <= c['N']]
+
+    if sample is not None and sample < len(configurations):
+        chosen = np.random.default_rng(seed).choice(len(configurations), size=sample, replace=False)
+        configurations = [configurations[i] for i in sorted(chosen)]
+
+    # Replicate r has the same seed for all sets of parameters, so that they are compared on the same initial populations
+    seeds = np.random.SeedSequence(seed).generate_state(replicates)
+
+    runs = []
+    for c in configurations:
+        for r in range(replicates):
+            # The number of generations is part of the name, so that the runs of a longer sweep are not taken for the shorter ones
+            output = f"{c['encode']}_{c['selection']}_{c['crossover']}_m{c['mutation']}_p{c['n_select']}_N{c['N']}_g{generation}_rep{r+1}"
+            runs.append(dict(c, generation=generation, replicate=r+1, seed=int(seeds[r]), output=output))
+
+    return runs
+
+def run(parameters, results_dir, cache_file=None):
+    """
+    Run the genetic algorithm for one set of parameters (in a process of the pool).
+    """
+    logger.setLevel(logging.WARNING)
+    genetic_algorithm(parameters['encode'], parameters['selection'], parameters['crossover'], parameters['output'],
+                      mutation_rate=parameters['mutation'], N=parameters['N'], n_select=parameters['n_select'],
+                      generation=parameters['generation'], seed=parameters['seed'], results_dir=results_dir, cache_file=cache_file)
+
+    return parameters['output']
+
+def summarise(runs, results_dir):
+    """
+    Summarise the fitness scores of each run from its summary file (see summary.py): maximum and mean fitness of the last generation,
+    best fitness over all generations and diversity of the last generation.
+
+    Return:
+        pd.DataFrame: one row per run, with its parameters
+    """
+    rows = []
+    for parameters in runs:
+        last = pd.read_csv(os.path.join(results_dir, parameters['output'] + '_summary.csv')).iloc[-1]
+        rows.append(dict(parameters,
+                         final_max=last['max'],
+                         final_mean=round(last['mean'], 4),
+                         best=last['best'],
+                         final_diversity=last['diversity']))
+
+    return pd.DataFrame(rows)
+
+### Main function
+def sweep(grid, name='sweep', replicates=1, sample=None, seed=0, generation=10, workers=None, results_dir='Results', cache_file='fitness_cache.json'):
+    """
+    Run the genetic algorithm for each set of parameters of a sweep and write a summary table.
+
+    Parameters:
+        - grid (dict): values of each parameter (see PARAMETERS)
+        - name (str, optional): name of the summary table (<name>_summary.csv). Default = 'sweep'
+        - replicates, sample, seed: see sweep_runs
+        - generation (int, optional): number of generations of each run. Default = 10
+        - workers (int, optional): number of processes. Default = number of CPUs
+        - results_dir (str, optional): folder of the results. Default = 'Results'
+        - cache_file (str, optional): name of the JSON file of the fitness cache shared by the runs, in the results folder (None: no shared cache). Default = 'fitness_cache.json'
+
+    Return:
+        csv : output files of each run (see genetic_algorithm) and summary table of the sweep
+    """
+    os.makedirs(results_dir, exist_ok=True)
+    runs = sweep_runs(grid, replicates, sample, seed, generation)
+    cache_file = os.path.join(results_dir, cache_file) if cache_file else None
+
+    # The JSON file is written at the end of a run: the runs without it are (re)started
+    todo = [p for p in runs if not os.path.exists(os.path.join(results_dir, p['output'] + '.json'))]
+    logger.info(f'{len(runs)} runs, {len(runs) - len(todo)} already done')
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(run, p, results_dir, cache_file) for p in todo]
+        for done, future in enumerate(as_completed(futures), 1):
+            logger.info(f'{future.result()} done ({done}/{len(todo)})')
+
+    summary = summarise(runs, results_dir)
+    summary.to_csv(os.path.join(results_dir, name + '_summary.csv'), index=False)
+    logger.info(f'Summary saved to {os.path.join(results_dir, name + "_summary.csv")}')
 
-### Initialisation
-encode = 'living'   # ['living' or 'pattern']
-selection = ['random', 'best', 'weighted', 'tournament']
-crossover = 'half'    # ['half', '1p', '2p']
-mutation_rate = 0.1    # [0.01, 0.05, 0.1, 0.5]
-n_select = 4    # [2, 4, 6]
+### Parse the arguments
+if __name__ == "__main__":
 
-param_modif = selection
+    parser = argparse.ArgumentParser(description='Run a parameter sweep of the genetic algorithm')
+    parser.add_argument('--encode', nargs='+', type=str, choices=['living', 'pattern'], default=PARAMETERS['encode'], help='Encoding types')
+    parser.add_argument('--selection', nargs='+', type=str, choices=['random', 'best', 'weighted', 'tournament'], default=PARAMETERS['selection'], help='Selection types')
+    parser.add_argument('--crossover', nargs='+', type=str, choices=['half', '1p', '2p'], default=PARAMETERS['crossover'], help='Crossover types')
+    parser.add_argument('--mutation', nargs='+', type=float, default=PARAMETERS['mutation'], help='Mutation rates')
+    parser.add_argument('--parents', nargs='+', type=int, default=PARAMETERS['n_select'], help='Numbers of parent rules selected')
+    parser.add_argument('--N', nargs='+', type=int, default=PARAMETERS['N'], help='Population sizes')
+    parser.add_argument('--replicates', type=int, default=1, help='Number of runs of each set of parameters (1 by default)')
+    parser.add_argument('--sample', type=int, help='Number of sets of parameters drawn at random from the grid (all of them by default)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the sample and of the replicates (0 by default)')
+    parser.add_argument('--generation', type=int, default=10, help='Number of generations of each run (10 by default)')
+    parser.add_argument('--workers', type=int, help='Number of processes (number of CPUs by default)')
+    parser.add_argument('--name', type=str, default='sweep', help='Name of the summary table ("sweep" by default)')
+    parser.add_argument('--results', type=str, default='Results', help='Folder of the results ("Results" by default)')
+    parser.add_argument('--cache-file', type=str, default='fitness_cache.json', help='Name of the fitness cache shared by the runs, in the folder of the results ("fitness_cache.json" by default, "" to disable it)')
+    args = parser.parse_args()
 
-### Test function
-def test_parameter(encode, selection, crossover, mutation_rate, n_select):
-    for i in range(len(param_modif)):
-        output = 'selection_'+str(param_modif[i])
-        genetic_algorithm(encode, selection, crossover, output, mutation_rate, N=10, n_select, generation=10)
-        print(str(output) + ' done')
+    grid = {
+        'encode': args.encode,
+        'selection': args.selection,
+        'crossover': args.crossover,
+        'mutation': args.mutation,
+        'n_select': args.parents,
+        'N': args.N,
+    }
 
-### Run test parameters
-test_parameter(encode, selection, crossover, mutation_rate, n_select)
\ No newline at end of file
+    sweep(grid, name=args.name, replicates=args.replicates, sample=args.sample, seed=args.seed,
+          generation=args.generation, workers=args.workers, results_dir=args.results, cache_file=args.cache_file)
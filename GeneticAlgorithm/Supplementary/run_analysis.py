@@ -1,11 +1,22 @@
 import os
+import re
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 
 
 '''
-Automatically get all csv file from the directory (".csv" and "_generalisation.csv") and returns a lineplot using data from the ".csv" file and a boxplot using data from "_generalisation.csv".
+Automatically get all runs from the directory (".json" files of the genetic algorithm) and returns a lineplot of their fitness over the generations
+and a boxplot using data from "_generalisation.csv". The runs are grouped by the parameter being tested, read from their name: the names of the sweeps
+of experiments.py ("living_best_half_m0.1_p4_N10_g10_rep1") give all the parameters of the run, and the other names give one parameter and its value
+("selection_best_rep1"). The runs are grouped by the first parameter taking several values in the folder, or by the parameter given with --param.
+
+The files are read in parallel into a single table (mean fitness of each generation of each run, average score of each rule tested), cached in the folder
+as a Parquet file ("analysis_cache.parquet"): when the analysis is run again, only the files added or modified since then are read.
+The fitness of each run is read from its summary ("_summary.csv", one row per generation), or by chunks of generations from its ".csv" file if it has no summary.
 
 Input :
     str : path to folder containing the results
@@ -13,58 +24,180 @@ Input :
 Output :
     png : lineplot of the fitness over time
     png : box plot of the fitness score
-    
-'''
-
-# Add path to folder
-path = "../Results_select"
-
-os.chdir(path)
-
-# Get all files
-list_files = os.listdir()
-prefix = list(dict.fromkeys([i.split('_')[1] for i in list_files]))
 
-# Create dataframe with the average score of each rule and the parameter being tested
-generalisation_table = pd.DataFrame()
-data_table = pd.DataFrame(columns=['Rep', 'generation', 'fitness', 'param'])
-
-# For each set of parameter
-for p in prefix:
-    fitness_files=[i for i in list_files if p in i and '.csv' in i and not 'generalisation' in i]
-    generalisation_files= [i for i in list_files if p in i and 'generalisation.csv' in i]
+'''
 
-    # Average the fitness score for each rule
-    generalisation_mean = []
-    for file in generalisation_files:
+COLUMNS = ['source', 'mtime', 'run', 'kind', 'x', 'value']
+
+# Name of the runs of experiments.py (see sweep_runs)
+SWEEP_NAME = re.compile(r'(?P<encode>[^_]+)_(?P<selection>[^_]+)_(?P<crossover>[^_]+)_m(?P<mutation>[^_]+)_p(?P<n_select>\d+)_N(?P<N>\d+)_g(?P<generation>\d+)_rep(?P<replicate>\d+)$')
+
+def run_parameters(run):
+    """
+    Read the parameters of a run from its name: all the parameters of a run of experiments.py, or the parameter and value of the other names ("<parameter>_<value>...").
+
+    Return:
+        dict: value (str) of each parameter
+    """
+    match = SWEEP_NAME.match(run)
+    if match:
+        return match.groupdict()
+
+    parts = run.split('_')
+    return {parts[0]: parts[1]} if len(parts) > 1 else {}
+
+def group_runs(runs, param=None):
+    """
+    Give each run the value of the parameter used to group the runs.
+
+    Parameters:
+        - runs (list): names of the runs
+        - param (str, optional): parameter grouping the runs. Default = first parameter taking several values (replicates excluded)
+
+    Return:
+        pd.Series: value of the parameter of each run (its name if the parameter is not in its name), indexed by run
+    """
+    runs = sorted(set(runs))
+    parameters = pd.DataFrame([run_parameters(run) for run in runs], index=runs)
+    if param is None:
+        varying = [column for column in parameters.columns if column != 'replicate' and parameters[column].nunique() > 1]
+        param = (varying or list(parameters.columns) or [None])[0]
+    if param is None:
+        return pd.Series(runs, index=runs)
+    if param not in parameters.columns:
+        raise ValueError(f'Parameter {param} not found in the names of the runs (parameters: {", ".join(parameters.columns)})')
+
+    return parameters[param].fillna(pd.Series(runs, index=runs))
+
+def generation_means(run):
+    """
+    Return the generations and the mean fitness of each generation of a run (path without extension).
+    """
+    if os.path.exists(run + '_summary.csv'):
+        summary = pd.read_csv(run + '_summary.csv', usecols=['generation', 'mean'])
+        return summary['generation'].to_numpy(dtype=int), summary['mean'].to_numpy()
+
+    # Runs without summary: read the fitness scores of the population by chunks of generations
+    generations, means = [], []
+    for chunk in pd.read_csv(run + '.csv', chunksize=100):
+        columns = [column for column in chunk.columns if column.startswith('rule')]
+        generations.append(chunk['generation'].to_numpy(dtype=int))
+        means.append(chunk[columns].mean(axis=1).to_numpy())
+
+    return np.concatenate(generations), np.concatenate(means)
+
+def result_files(path):
+    """
+    Find the result files of the runs of a folder: one fitness file per run (its summary, or its ".csv" file if it has none) and its generalisation file if any.
+
+    Return:
+        dict: kind ('fitness' or 'generalisation') and run of each file
+    """
+    list_files = set(os.listdir(path))
+    files = {}
+    for run in sorted(i[:-len('.json')] for i in list_files if i.endswith('.json')):
+        if run + '_summary.csv' in list_files:
+            files[run + '_summary.csv'] = ('fitness', run)
+        elif run + '.csv' in list_files:
+            files[run + '.csv'] = ('fitness', run)
+        else:
+            continue
+
+        if run + '_generalisation.csv' in list_files:
+            files[run + '_generalisation.csv'] = ('generalisation', run)
+
+    return files
+
+def load_file(path, source, kind, run):
+    """
+    Read a result file into rows of the analysis table: the mean fitness of each generation, or the average score of each rule on random cellular automata.
+
+    Return:
+        pd.DataFrame: columns source, mtime, run, kind, x (generation or rule) and value
+    """
+    file = os.path.join(path, source)
+    mtime = os.stat(file).st_mtime_ns
+
+    if kind == 'fitness':
+        x, value = generation_means(os.path.join(path, run))
+
+    else:
         generalisation_data = pd.read_csv(file)
-        generalisation_mean.extend(list(generalisation_data.mean(axis=1)))
-        print(len(generalisation_mean))
-    generalisation_table[str(p)] = generalisation_mean
-
-    # Average fitness score for each generation
-    rep = 0
-    for file in fitness_files:
-        rep = rep + 1
-        fitness_data = pd.read_csv(file, index_col=0)
-        columns = [column for column in df.columns if column.startswith('rule')]
-        fitness_data = fitness_data[columns].T
-        fitness_mean = fitness_data.mean()
-        fitness_mean.name = 'fitness'
-        fitness_subset = fitness_mean.reset_index()
-        fitness_subset['Rep'] = rep
-        fitness_subset['param'] = p
-        data_table = pd.concat([data_table, fitness_subset], ignore_index=True)
-
-# Plots
-boxplotgeneralisation = plt.figure()
-boxplotgeneralisation = sns.boxplot(data=generalisation_table)
-boxplotgeneralisation.figure.savefig('BoxplotGeneralisation.png')
-
-lineplot_fitness = plt.figure()
-lineplot_fitness = sns.lineplot(data=data_table, x='generation', y='fitness', hue='param')
-lineplot_fitness.figure.savefig('LineplotFitness.png')
-
-    
-
-
+        columns = [column for column in generalisation_data.columns if column.startswith('rep')]
+        x = generalisation_data['rule'].to_numpy(dtype=int)
+        value = generalisation_data[columns].mean(axis=1).to_numpy()
+
+    return pd.DataFrame({'source': source, 'mtime': mtime, 'run': run, 'kind': kind, 'x': x, 'value': value})
+
+def load_results(path, workers=None, cache='analysis_cache.parquet'):
+    """
+    Load the results of all runs of a folder into one table, cached in a Parquet file of the folder.
+    Only the files that are new or were modified since they were cached (different modification time) are read, in parallel.
+
+    Parameters:
+        - path (str): path to folder containing the results
+        - workers (int, optional): number of processes reading the files. Default = number of CPUs
+        - cache (str, optional): name of the cache file in the folder. Default = 'analysis_cache.parquet'
+
+    Return:
+        pd.DataFrame: one row per generation of each run (kind 'fitness') and per rule tested (kind 'generalisation'), see load_file
+    """
+    files = result_files(path)
+    mtimes = {source: os.stat(os.path.join(path, source)).st_mtime_ns for source in files}
+
+    # Keep the rows of the files that did not change
+    cache = os.path.join(path, cache)
+    cached = pd.read_parquet(cache, columns=COLUMNS) if os.path.exists(cache) else pd.DataFrame(columns=COLUMNS)
+    valid = {source for source, mtime in cached[['source', 'mtime']].drop_duplicates().itertuples(index=False) if mtimes.get(source) == mtime}
+    kept = cached[cached['source'].isin(valid)]
+    new = [source for source in files if source not in valid]
+
+    tables = [kept] if len(kept) else []
+    if new:
+        kinds = [files[source][0] for source in new]
+        runs = [files[source][1] for source in new]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            tables += pool.map(load_file, [path] * len(new), new, kinds, runs, chunksize=16)
+
+    table = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame(columns=COLUMNS)
+    if new or len(kept) < len(cached):
+        table.to_parquet(cache, index=False)
+    print(f'{len(files)} files, {len(new)} read, {len(files) - len(new)} from the cache')
+
+    return table
+
+def analyse(path, workers=None, param=None):
+    table = load_results(path, workers)
+    table['param'] = table['run'].map(group_runs(table['run'], param))
+    fitness = table[table['kind'] == 'fitness']
+    generalisation = table[table['kind'] == 'generalisation']
+
+    # Plots
+    boxplotgeneralisation = plt.figure()
+    boxplotgeneralisation = sns.boxplot(data=generalisation, x='param', y='value')
+    boxplotgeneralisation.figure.savefig(os.path.join(path, 'BoxplotGeneralisation.png'))
+
+    # Mean fitness of each generation over the runs of each parameter, with its 95% confidence interval
+    lineplot_fitness, ax = plt.subplots()
+    for p, data in fitness.groupby('param'):
+        stats = data.groupby('x')['value'].agg(['mean', 'std', 'count'])
+        interval = 1.96 * stats['std'].fillna(0) / np.sqrt(stats['count'])
+        ax.plot(stats.index, stats['mean'], label=p)
+        ax.fill_between(stats.index, stats['mean'] - interval, stats['mean'] + interval, alpha=0.2)
+    ax.set_xlabel('generation')
+    ax.set_ylabel('fitness')
+    ax.legend(title='param')
+    lineplot_fitness.savefig(os.path.join(path, 'LineplotFitness.png'))
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Plot the fitness and generalisation scores of the runs of a folder')
+    parser.add_argument('--path', type=str, default='../Results_select', help='Path to folder containing the results ("../Results_select" by default)')
+    parser.add_argument('--workers', type=int, help='Number of processes reading the result files (number of CPUs by default)')
+    parser.add_argument('--param', type=str, help='Parameter grouping the runs, e.g. "mutation" (first parameter taking several values by default)')
+    args = parser.parse_args()
+
+    try:
+        analyse(args.path, args.workers, args.param)
+    except ValueError as error:
+        parser.error(str(error))
@@ -1,10 +1,13 @@
 import numpy as np
 import numpy.random as random
+from encode import rule_to_genome, living_neighbourhood
+from rule_engine import neighbourhood_size, neighbour_count
+import time as clock
 
 ### Create initial matrix
 def create_matrix(rows=100, columns=100, seed=None):
     """
-    Create a random binary matrix.
+    Create a random binary matrix, from its own generator: the state of numpy.random (used by the genetic algorithm) is not changed.
 
     Parameters:
         row (int): number of rows of the matrix. Default=100
@@ -15,8 +18,7 @@ def create_matrix(rows=100, columns=100, seed=None):
         numpy.ndarray: A binary matrix of shape (row, column)
 
     """
-    random.seed(seed)
-    m = random.randint(0, 2, size = (rows,columns))
+    m = random.RandomState(seed).randint(0, 2, size = (rows,columns))
 
     return m
 
@@ -107,6 +109,152 @@ def CellularAutomaton_pattern(rule, matrix, time=100):
 
     return matrix
 
+### Lookup-table transition
+"""
+The rules can also be turned once into dense lookup tables (see rule_table) to update all cells of the matrix at once:
+    - living encoding: the table has 18 entries, the index of a cell is 9 * cell + number of living neighbours
+      (2 * (size + 1) entries and index (size + 1) * cell + number of living neighbours for a larger neighbourhood of 'size' cells)
+    - pattern encoding: the table has 512 entries, the index of a cell is its nine-digit key read as a binary number
+"""
+
+def rule_table(rule, encode):
+    """
+    Convert an encoded rule into a dense lookup table.
+
+    Parameters:
+        - rule (dict): encoded rule (see encode.py)
+        - encode (str): encoding type of the rule. Takes 2 possible values: 'living' or 'pattern'
+
+    Return:
+        np.ndarray: uint8 vector giving the new state of a cell for each index (18 entries for 'living' with 8 neighbours, 512 for 'pattern')
+    """
+    # The genome of a rule is its lookup table
+    return rule_to_genome(rule, encode)
+
+def rule_index(matrix, encode):
+    """
+    Compute the lookup table index of every cell of a matrix (or of a stack of matrices), with periodic boundaries.
+
+    Parameters:
+        - matrix (np.ndarray): 2D matrix representing the cellular automaton, or 3D stack of matrices
+        - encode (str): encoding type of the rule. Takes 2 possible values: 'living' or 'pattern'
+
+    Return:
+        np.ndarray: array of the same shape holding the table index of each cell
+    """
+    if encode.startswith('living'):
+        radius, neighbourhood = living_neighbourhood(encode)
+        size = neighbourhood_size(radius, neighbourhood)
+        matrix = matrix.astype(np.uint8 if 2 * size + 1 < 256 else np.uint16)
+
+        # Count the number of living neighbours with the separable sums of the rule engine (8 surrounding cells by default)
+        index = (size + 1) * matrix + neighbour_count(matrix, radius, neighbourhood)
+
+    else:
+        matrix = matrix.astype(np.uint16)
+
+        # Code each cell with its left and right neighbours as a three-digit binary number (left, cell, right)
+        line = (np.roll(matrix, 1, axis=-1) << 2) | (matrix << 1) | np.roll(matrix, -1, axis=-1)
+
+        # Nine-digit key: cell, line above (upper-left to upper-right), left and right neighbours, line below
+        index = (matrix << 8) | (np.roll(line, 1, axis=-2) << 5) | ((line & 4) << 2) | ((line & 1) << 3) | np.roll(line, -1, axis=-2)
+
+    return index
+
+def CellularAutomaton_lookup(table, matrix, encode, time=100, cycle=4):
+    """
+    Update a matrix according to a rule converted into a lookup table. Gives the same result as CellularAutomaton_living or CellularAutomaton_pattern.
+
+    Parameters:
+        - table (np.ndarray): lookup table of the rule (see rule_table)
+        - matrix (np.ndarray): initial 2D matrix representing the cellular automaton
+        - encode (str): encoding type of the rule. Takes 2 possible values: 'living' or 'pattern'
+        - time (int, optional): number of iterations to update the matrix. Default=100
+        - cycle (int, optional): longest period of the cycles detected to stop the simulation early (see CellularAutomaton_batch). Default=4
+
+    Return:
+        np.ndarray: updated matrix after applying the rule for the given number of iterations.
+    """
+    return CellularAutomaton_batch(table, matrix, encode, time, cycle)[0]
+
+def CellularAutomaton_batch(tables, matrices, encode, time=100, cycle=4, stats=None):
+    """
+    Update a stack of matrices together, each one according to its own rule converted into a lookup table.
+    A matrix that comes back to one of its last 'cycle' states has reached a fixed point or a cycle: it is no longer updated and its final state is taken from the cycle.
+
+    Parameters:
+        - tables (np.ndarray): lookup tables of the rules, one row per matrix (N, table size). A single table is used for all matrices
+        - matrices (np.ndarray): initial matrices (N, rows, columns). A single 2D matrix is used as initial state for all rules
+        - encode (str): encoding type of the rules. Takes 2 possible values: 'living' or 'pattern'
+        - time (int, optional): number of iterations to update the matrices. Default=100
+        - cycle (int, optional): longest period of the cycles detected (1 only detects fixed points, 0 disables the detection). Default=4
+        - stats (dict, optional): if provided, the number of matrix updates computed ('steps') and skipped ('steps_saved') are added to it
+
+    Return:
+        np.ndarray: updated matrices (N, rows, columns) after applying the rules for the given number of iterations.
+    """
+    tables = np.atleast_2d(tables)
+    matrices = np.asarray(matrices, dtype=np.uint8)
+    n = max(len(tables), len(matrices) if matrices.ndim == 3 else 1)
+    rows, columns = matrices.shape[-2:]
+
+    tables = np.broadcast_to(tables, (n, tables.shape[1]))
+    matrices = np.broadcast_to(matrices, (n, rows, columns)).copy()
+    final = matrices.astype(int)
+
+    # Matrices still updated, and their last states packed into bytes (state t is in history[t % cycle])
+    active = np.arange(n)
+    if cycle:
+        history = np.zeros((cycle, n, (rows * columns + 7) // 8), dtype=np.uint8)
+        history[0] = np.packbits(matrices.reshape(n, -1), axis=1)
+    steps = 0
+    steps_saved = 0
+
+    # Offset the index of each matrix to gather from its own table in the flattened tables
+    flat_tables = np.ascontiguousarray(tables).ravel()
+    offset = (np.arange(n) * tables.shape[1])[:, None, None]
+
+    for t in range(1, time + 1):
+        matrices = flat_tables[rule_index(matrices, encode) + offset]
+        steps += len(active)
+
+        if not cycle:
+            continue
+
+        # Compare the new states with the last states of each matrix
+        packed = np.packbits(matrices.reshape(len(active), -1), axis=1)
+        done = np.zeros(len(active), dtype=bool)
+        for period in range(1, min(cycle, t) + 1):
+            found = (packed == history[(t - period) % cycle]).all(axis=1) & ~done
+            if found.any():
+                # The states repeat from step t-period: the final state is the one at the same position in the cycle
+                start = t - period
+                final_step = start + (time - start) % period
+                states = np.unpackbits(history[final_step % cycle, found], axis=1, count=rows * columns)
+                final[active[found]] = states.reshape(-1, rows, columns)
+                steps_saved += int(found.sum()) * (time - t)
+                done |= found
+
+        history[t % cycle] = packed
+
+        # Stop updating the matrices that reached a cycle
+        if done.any():
+            active = active[~done]
+            matrices = matrices[~done]
+            history = history[:, ~done]
+            if len(active) == 0:
+                break
+            flat_tables = np.ascontiguousarray(tables[active]).ravel()
+            offset = (np.arange(len(active)) * tables.shape[1])[:, None, None]
+
+    final[active] = matrices
+
+    if stats is not None:
+        stats['steps'] = stats.get('steps', 0) + steps
+        stats['steps_saved'] = stats.get('steps_saved', 0) + steps_saved
+
+    return final
+
 ### Fitness Evaluation
 def fitness(matrix):
     """
@@ -124,4 +272,51 @@ def fitness(matrix):
 
     fitness = -0.04*(100*prop-50)**2+100
 
-    return fitness
\ No newline at end of file
+    return fitness
+
+def fitness_batch(matrices):
+    """
+    Calculate the fitness of a stack of final states at once (see fitness).
+
+    Parameters:
+        matrices(np.ndarray): 3D array (N, rows, columns) representing the final states of N cellular automata
+
+    Returns:
+        np.ndarray: N fitness scores
+    """
+    # Count the proportion of living cells of each matrix
+    n, rows, columns = matrices.shape
+    prop = matrices.reshape(n, -1).sum(axis=1) / (rows * columns)
+
+    fitness = -0.04*(100*prop-50)**2+100
+
+    return fitness
+
+def population_fitness(tables, matrix, encode, time=100, batch=100, stats=None):
+    """
+    Evaluate a population of rules from the same initial matrix, simulating the rules by stacks of 'batch' matrices.
+
+    Parameters:
+        - tables (np.ndarray): lookup tables of the rules (N, table size)
+        - matrix (np.ndarray): initial 2D matrix shared by all rules
+        - encode (str): encoding type of the rules. Takes 2 possible values: 'living' or 'pattern'
+        - time (int, optional): number of iterations to update the matrices. Default=100
+        - batch (int, optional): number of rules simulated together (bounds the memory used). Default=100
+        - stats (dict, optional): if provided, the number of matrix updates computed and skipped are added to it (see CellularAutomaton_batch),
+          with the time spent simulating ('simulation_time') and scoring ('fitness_time') the rules
+
+    Return:
+        np.ndarray: N fitness scores
+    """
+    scores = []
+    for i in range(0, len(tables), batch):
+        start = clock.perf_counter()
+        final_CA = CellularAutomaton_batch(tables[i:i+batch], matrix, encode, time, stats=stats)
+        middle = clock.perf_counter()
+        scores.append(fitness_batch(final_CA))
+
+        if stats is not None:
+            stats['simulation_time'] = stats.get('simulation_time', 0) + middle - start
+            stats['fitness_time'] = stats.get('fitness_time', 0) + clock.perf_counter() - middle
+
+    return np.concatenate(scores)
\ No newline at end of file
@@ -0,0 +1,99 @@
+from collections import OrderedDict
+import numpy as np
+import hashlib
+import json
+import os
+
+"""
+Cache of the fitness scores already computed, so that rules identical to rules already evaluated are not simulated again.
+A score is identified by a hash of the rule and of the simulation settings (seed and size of the initial matrix, number of iterations, and neighbourhood of the larger living encodings).
+"""
+
+class FitnessCache:
+    """
+    Least recently used cache of fitness scores, optionally saved to a JSON file to be reused between runs.
+
+    Parameters:
+        - size (int): maximum number of scores kept in the cache. Default = 10000
+        - path (str, optional): path to the JSON file where the scores are loaded from and saved to
+    """
+
+    def __init__(self, size=10000, path=None):
+        self.size = size
+        self.path = path
+        self.scores = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        if path is not None and os.path.exists(path):
+            with open(path, 'r') as file:
+                self.scores.update(json.load(file))
+            self._evict()
+
+    @staticmethod
+    def key(table, seed, shape, time, encode=None):
+        """
+        Compute the key of a rule evaluated in given simulation settings.
+
+        Parameters:
+            - table (np.ndarray): lookup table of the rule
+            - seed (int): seed of the initial matrix
+            - shape (tuple): shape (rows, columns) of the initial matrix
+            - time (int): number of iterations of the simulation
+            - encode (str, optional): encoding type of the rule, to tell apart the living encodings of two neighbourhoods of the same size (see encode.living_encoding)
+
+        Return:
+            str: hexadecimal hash of the packed rule and the settings
+        """
+        settings = f'{len(table)};{seed};{shape[0]}x{shape[1]};{time}'
+        if encode is not None and encode.startswith('living:'):
+            settings += f';{encode}'
+        settings = settings.encode()
+        digest = hashlib.blake2b(np.packbits(table).tobytes() + settings, digest_size=16)
+
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Return the score of a key, or None if it is not in the cache.
+        """
+        if key in self.scores:
+            self.scores.move_to_end(key)
+            self.hits += 1
+            return self.scores[key]
+
+        self.misses += 1
+        return None
+
+    def put(self, key, score):
+        """
+        Add the score of a key to the cache, removing the least recently used scores beyond the size of the cache.
+        """
+        self.scores[key] = float(score)
+        self.scores.move_to_end(key)
+        self._evict()
+
+    def _evict(self):
+        while len(self.scores) > self.size:
+            self.scores.popitem(last=False)
+
+    def save(self):
+        """
+        Save the scores to the JSON file of the cache (if any).
+        The scores saved meanwhile by other runs sharing the file are kept, and the file is replaced at once so that it is never read half written.
+        """
+        if self.path is None:
+            return
+
+        scores = OrderedDict()
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as file:
+                scores.update(json.load(file))
+        scores.update(self.scores)
+        while len(scores) > self.size:
+            scores.popitem(last=False)
+
+        temporary = f'{self.path}.{os.getpid()}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(scores, file)
+        os.replace(temporary, self.path)
@@ -0,0 +1,80 @@
+from encode import pack_genomes, unpack_genomes
+import numpy.random as random
+import numpy as np
+import json
+import os
+
+"""
+Checkpoints of the genetic algorithm, to resume a run that was interrupted.
+A checkpoint is taken at the start of a generation and holds, in a compressed NumPy file (.npz):
+    - the generation and the genomes of the population (bit-packed)
+    - the state of the random number generator (numpy.random)
+    - the content of the fitness cache, in least recently used order
+    - the size of the CSV files (scores and summary) at that point, so that the rows written afterwards can be removed
+    - the parameters of the run, to refuse a checkpoint from another run
+A resumed run gives exactly the same population and fitness scores as an uninterrupted one.
+"""
+
+def save_checkpoint(path, g, population, cache, csv_offsets, parameters):
+    """
+    Save the state of the genetic algorithm at the start of a generation.
+
+    Parameters:
+        - path (str): path to the checkpoint file
+        - g (int): current generation
+        - population (np.ndarray): genomes of the population (N, genome size)
+        - cache (FitnessCache): cache of the fitness scores
+        - csv_offsets (list): size in bytes of each CSV file (see ResultWriter.tell)
+        - parameters (dict): parameters of the run
+    """
+    name, keys, pos, has_gauss, cached_gaussian = random.get_state()
+
+    # Write to a temporary file first, so that an interruption does not corrupt the previous checkpoint
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as file:
+        np.savez_compressed(
+            file,
+            generation=g,
+            population=pack_genomes(population),
+            rng_keys=keys,
+            rng_state=np.array([pos, has_gauss]),
+            rng_gaussian=cached_gaussian,
+            cache_keys=np.array(list(cache.scores.keys()), dtype=str),
+            cache_scores=np.array(list(cache.scores.values()), dtype=float),
+            cache_counts=np.array([cache.hits, cache.misses]),
+            csv_offsets=np.array(csv_offsets),
+            parameters=json.dumps(parameters),
+        )
+    os.replace(tmp, path)
+
+def load_checkpoint(path, encode, cache, parameters):
+    """
+    Restore the state of the genetic algorithm from a checkpoint: the random number generator and the cache are restored in place.
+
+    Parameters:
+        - path (str): path to the checkpoint file
+        - encode (str): encoding type of the rules. Takes 2 possible values: 'living' or 'pattern'
+        - cache (FitnessCache): cache of the fitness scores, replaced by the cache of the checkpoint
+        - parameters (dict): parameters of the run, which must be those of the checkpoint
+
+    Return:
+        tuple: generation (int), genomes of the population (np.ndarray) and size in bytes of each CSV file (list)
+
+    Raises:
+        ValueError: if the checkpoint was taken with other parameters
+    """
+    with np.load(path) as checkpoint:
+        saved = json.loads(str(checkpoint['parameters']))
+        if saved != json.loads(json.dumps(parameters)):
+            raise ValueError(f'The checkpoint {path} was taken with other parameters: {saved}')
+
+        pos, has_gauss = checkpoint['rng_state']
+        random.set_state(('MT19937', checkpoint['rng_keys'], int(pos), int(has_gauss), float(checkpoint['rng_gaussian'])))
+
+        cache.scores.clear()
+        cache.scores.update(zip(checkpoint['cache_keys'].tolist(), checkpoint['cache_scores'].tolist()))
+        cache.hits, cache.misses = checkpoint['cache_counts'].tolist()
+
+        population = unpack_genomes(checkpoint['population'], encode)
+
+        return int(checkpoint['generation']), population, checkpoint['csv_offsets'].tolist()
@@ -1,4 +1,4 @@
-import itertools
+import numpy as np
 import numpy.random as random
 
 """
@@ -6,6 +6,9 @@ Functions used for crossover:
     - crossover_half: combine half rules of two parents into a new rule
     - crossover_random_1p: combine two parent rules at a random position using one-point crossover
     - crossover_random_2p: combine two parent rules at two random positions using two-point crossover
+
+The rules are genomes (see encode.py). The functions also take stacks of parents (N, genome size) to create N children at once:
+the crossover positions are drawn for all children together and each child takes the genes of a parent where a mask is true.
 """
 
 def crossover_half(parent1, parent2):
@@ -13,16 +16,15 @@ def crossover_half(parent1, parent2):
     Combine half rules of two distinct parents into a new rule
     
     Parameters:
-        - parent1 (dict): rule of the first parent
-        - parent2 (dict): rule of the second parent
+        - parent1 (np.ndarray): genome of the first parent, or genomes of the first parents (N, genome size)
+        - parent2 (np.ndarray): genome of the second parent, or genomes of the second parents (N, genome size)
     
     Return:
-        dict: new rule combining the first half of parent1 and the second half of parent2
+        np.ndarray: new genome(s) combining the first half of parent1 and the second half of parent2
     """
 
-    half_rule = int(len(parent1)/2)
-    rule = dict(itertools.islice(parent1.items(), half_rule))
-    rule.update(dict(itertools.islice(parent2.items(), half_rule, int(len(parent2)))))
+    half_rule = int(parent1.shape[-1]/2)
+    rule = np.concatenate((parent1[..., :half_rule], parent2[..., half_rule:]), axis=-1)
 
     return rule
 
@@ -31,18 +33,18 @@ def crossover_random_1p(parent1, parent2):
     Combine two parent rules at a random position into a new rule
     
     Parameters:
-        - parent1 (dict): rule of the first parent
-        - parent2 (dict): rule of the second parent
+        - parent1 (np.ndarray): genome of the first parent, or genomes of the first parents (N, genome size)
+        - parent2 (np.ndarray): genome of the second parent, or genomes of the second parents (N, genome size)
     
     Return:
-        dict: new rule combining the first part from parent1 and the remainder from parent2
+        np.ndarray: new genome(s) combining the first part from parent1 and the remainder from parent2
     """
-    
-    # Randomly choose the position of the crossover
-    pos = random.randint(1,len(parent1))
+    genes = parent1.shape[-1]
+
+    # Randomly choose the position of the crossover of each child
+    pos = random.randint(1, genes, size=parent1.shape[:-1] + (1,))
 
-    rule = dict(itertools.islice(parent1.items(), pos))
-    rule.update(dict(itertools.islice(parent2.items(), pos, int(len(parent2)))))
+    rule = np.where(np.arange(genes) < pos, parent1, parent2)
 
     return rule
 
@@ -51,19 +53,19 @@ def crossover_random_2p(parent1, parent2):
     Combine two parent rules at two random positions using two-point crossover
     
     Parameters:
-        - parent1 (dict): rule of the first parent
-        - parent2 (dict): rule of the second parent
+        - parent1 (np.ndarray): genome of the first parent, or genomes of the first parents (N, genome size)
+        - parent2 (np.ndarray): genome of the second parent, or genomes of the second parents (N, genome size)
     
     Return:
-        dict: new rule combining the first part from parent1 up to pos1, the middle part from parent2 between pos1 and pos2 and the last part from parent1 after pos2
+        np.ndarray: new genome(s) combining the first part from parent1 up to pos1, the middle part from parent2 between pos1 and pos2 and the last part from parent1 after pos2
     """
-    
-    # Randomly choose the positions of the crossover
-    pos1 = random.randint(1,len(parent1)-2)
-    pos2 = random.randint(pos1+1, len(parent1))
+    genes = parent1.shape[-1]
+
+    # Randomly choose the positions of the crossover of each child
+    pos1 = random.randint(1, genes-2, size=parent1.shape[:-1] + (1,))
+    pos2 = random.randint(pos1+1, genes)
 
-    rule = dict(itertools.islice(parent1.items(), pos1))
-    rule.update(dict(itertools.islice(parent2.items(), pos1, pos2)))
-    rule.update(dict(itertools.islice(parent1.items(), pos2, int(len(parent1)))))
+    position = np.arange(genes)
+    rule = np.where((position >= pos1) & (position < pos2), parent2, parent1)
 
-    return rule
\ No newline at end of file
+    return rule
@@ -1,23 +1,40 @@
+import numpy as np
 import numpy.random as random
 import itertools
+import os
+import sys
+
+# The outer-totalistic rules (living encodings) share the rule engine of the neighbouring folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'RuleEngine'))
+from rule_engine import neighbourhood_size, parse_neighbourhood
 
 """
 Encoding functions
 - EncodingLiving: Create a rule according to the number of living neighbouring cells
+  (the 8 surrounding cells, or a larger neighbourhood with the encodings 'living:R<radius>,N<M|N>', see living_encoding)
 - EncodingPattern: Create a rule according to the pattern around the target cell
+
+Genome functions
+- Genome: Create random rules as genomes, the compact representation used by the genetic algorithm
+- rule_to_genome / genome_to_rule: Convert a rule between its dictionary (JSON) and genome representations
+- pack_genomes / unpack_genomes: Store genomes with 8 conditions per byte
 """
 
-def EncodingLiving():
+def EncodingLiving(radius=1, neighbourhood='moore'):
     """
     Encode a random transition rule based on the current cell states and the number of living cells.
 
+    Parameters:
+        - radius (int, optional): radius of the neighbourhood. Default = 1
+        - neighbourhood (str, optional): 'moore' (square around the cell) or 'von_neumann' (cells at a Manhattan distance of at most radius). Default = 'moore'
+
     Return:
         dict:
             - keys are two-digit strings where the first digit is the initial state of the cell (0 = dead, 1 = alive) and the second digit is the number of living neighbors
             - values are the resulting state
     """
     
-    keys = [str(i)+str(x) for i in range(2) for x in range(9)]
+    keys = rule_keys(living_encoding(radius, neighbourhood))
     values = random.randint(0, 2, size=len(keys)).tolist()
 
     rule = dict(zip(keys, values))
@@ -46,3 +63,135 @@ def EncodingPattern():
     rule = dict(zip(keys, values))
 
     return rule
+
+
+### Larger neighbourhoods
+"""
+The living encoding counts the 8 surrounding cells by default. The encodings 'living:R<radius>,N<M|N>' count the living cells
+of a larger Moore (NM) or von Neumann (NN) neighbourhood instead, e.g. 'living:R2,NN' (see RuleEngine/rule_engine.py).
+"""
+
+def living_encoding(radius=1, neighbourhood='moore'):
+    """
+    Name the living encoding of a neighbourhood.
+
+    Parameters:
+        - radius (int, optional): radius of the neighbourhood. Default = 1
+        - neighbourhood (str, optional): 'moore' or 'von_neumann'. Default = 'moore'
+
+    Return:
+        str: 'living' for the 8 surrounding cells, 'living:R<radius>,N<M|N>' otherwise
+    """
+    neighbourhood_size(radius, neighbourhood)
+    if radius == 1 and neighbourhood == 'moore':
+        return 'living'
+
+    return f"living:R{radius},{'NM' if neighbourhood == 'moore' else 'NN'}"
+
+def living_neighbourhood(encode):
+    """
+    Read the neighbourhood of a living encoding.
+
+    Parameters:
+        - encode (str): living encoding, 'living' or 'living:R<radius>,N<M|N>'
+
+    Return:
+        tuple: radius and neighbourhood ('moore' or 'von_neumann')
+    """
+    return parse_neighbourhood(encode.partition(':')[2])
+
+
+### Genome representation
+"""
+A genome is a uint8 vector holding the resulting state of each key of the rule, in the order of rule_keys.
+The index of a key in the genome is (neighbourhood size + 1) * cell + number of living neighbours ('living', 9 * cell + neighbours for the 8 surrounding cells)
+or the key read as a binary number ('pattern'), so the genome is also the lookup table of the rule.
+"""
+
+def rule_keys(encode):
+    """
+    List the keys of a rule in the order of the genome.
+
+    Parameters:
+        - encode (str): encoding type. Takes 2 possible values: 'living' (or 'living:R<radius>,N<M|N>') or 'pattern'
+
+    Return:
+        list: keys of the rule (see EncodingLiving and EncodingPattern)
+    """
+    if encode.startswith('living'):
+        size = neighbourhood_size(*living_neighbourhood(encode))
+        return [str(i)+str(x) for i in range(2) for x in range(size + 1)]
+
+    return [''.join(str(val) for val in i) for i in itertools.product([0, 1], repeat=9)]
+
+def Genome(encode, n):
+    """
+    Encode n random transition rules as genomes.
+
+    Parameters:
+        - encode (str): encoding type. Takes 2 possible values: 'living' or 'pattern'
+        - n (int): number of rules
+
+    Return:
+        np.ndarray: uint8 array (n, number of keys), one genome per row
+    """
+    return random.randint(0, 2, size=(n, len(rule_keys(encode)))).astype(np.uint8)
+
+def rule_to_genome(rule, encode):
+    """
+    Convert a rule from its dictionary representation into a genome.
+
+    Parameters:
+        - rule (dict): encoded rule (see EncodingLiving and EncodingPattern)
+        - encode (str): encoding type of the rule. Takes 2 possible values: 'living' or 'pattern'
+
+    Return:
+        np.ndarray: uint8 vector, the genome of the rule
+    """
+    if encode.startswith('living'):
+        return np.array([rule[key] for key in rule_keys(encode)], dtype=np.uint8)
+
+    # Patterns missing from the rule keep the current state of the cell (first digit of the key)
+    genome = np.arange(512, dtype=np.uint16) >> 8
+    for key, value in rule.items():
+        genome[int(key, 2)] = value
+
+    return genome.astype(np.uint8)
+
+def genome_to_rule(genome, encode):
+    """
+    Convert a genome into the dictionary representation of the rule.
+
+    Parameters:
+        - genome (np.ndarray): genome of the rule
+        - encode (str): encoding type of the rule. Takes 2 possible values: 'living' or 'pattern'
+
+    Return:
+        dict: encoded rule (see EncodingLiving and EncodingPattern)
+    """
+    return dict(zip(rule_keys(encode), np.asarray(genome).tolist()))
+
+def pack_genomes(genomes):
+    """
+    Pack genomes with 8 conditions per byte (e.g. to save them on disk).
+
+    Parameters:
+        - genomes (np.ndarray): one genome, or an array of genomes (one per row)
+
+    Return:
+        np.ndarray: packed genomes
+    """
+    return np.packbits(genomes, axis=-1)
+
+def unpack_genomes(packed, encode):
+    """
+    Unpack genomes packed with pack_genomes.
+
+    Parameters:
+        - packed (np.ndarray): packed genomes
+        - encode (str): encoding type of the rules. Takes 2 possible values: 'living' or 'pattern'
+
+    Return:
+        np.ndarray: genomes
+    """
+    return np.unpackbits(packed, axis=-1, count=len(rule_keys(encode)))
@@ -1,9 +1,10 @@
 from automaton_fitness import *
+from encode import living_encoding
+from parallel import *
+from results import *
 import json
-import pandas as pd
 import logging
 import argparse
-import os
 
 ### Set logging
 logger = logging.getLogger(__name__)
@@ -16,14 +17,16 @@ formatter = logging.Formatter('%(asctime)s %(message)s', datefmt='%d/%m/%Y %I:%M
 ch.setFormatter(formatter)
 logger.addHandler(ch)
 
-def generalisation(json_file, encode, rep=100):
+def generalisation(json_file, encode, rep=100, seed=None, workers=1):
     """
     Extracts rules from a JSON file and evaluate their performance on randomly generated cellular automata.
 
     Parameters:
         json_file (str) : path to the json file containing the rules
-        encode (str) : Encoding type to use. Takes 2 possible values: 'living' or 'pattern'
+        encode (str) : Encoding type to use. Takes 2 possible values: 'living' (or 'living:R<radius>,N<M|N>', see encode.py) or 'pattern'
         rep (int) : number of tests to run per rule
+        seed (int optional) : seed of the random matrices of the tests (for reproducibility). If None, a seed is drawn and logged
+        workers (int optional) : number of processes used to run the tests. Default = 1
 
     Returns:
         csv : evaluation scores for each rule
@@ -31,38 +34,33 @@ def generalisation(json_file, encode, rep=100):
     idx = json_file.find('.json')
     prefix = json_file[:idx]
 
-    # Create dataframe
+    # Write the scores to the csv by batches of rules
     col_names = ['rule'] + ['rep'+str(i) for i in range (1, rep+1)] 
-    df = pd.DataFrame(columns=col_names)
+    writer = ResultWriter(prefix + "_generalisation.csv", col_names, integers=['rule'])
 
     # Retrieve rules
     with open(json_file, 'r') as file:
         rule = json.load(file)
 
-    nb_rule = 1
+    # All tests share the same random matrices, drawn at once from the seed (logged so that the run can be reproduced)
+    if seed is None:
+        seed = int(np.random.SeedSequence().generate_state(1)[0])
+    logger.info(f'Seed of the random matrices: {seed}')
+    matrices = replicate_matrices(rep, seed=seed)
 
-    for i in rule:
+    # Evaluate all rules on all matrices at once
+    tables = np.stack([rule_table(i, encode) for i in rule])
+    pool = create_pool(workers, matrices)
+    scores = parallel_generalisation_fitness(pool, tables, matrices, encode, time=100, workers=workers)
 
-        logger.info(f'Considering rule number: {nb_rule}')
-        new_line = [int(nb_rule)]
+    # Add one line per rule to csv with rule number and their scores
+    for nb_rule, rule_scores in enumerate(scores, 1):
+        writer.append([int(nb_rule)] + [round(float(score), 4) for score in rule_scores])
 
-        # Evaluate performance on random matrices
-        for r in range (rep):
-            init_CA = create_matrix(rows=100, columns=100)
+    if pool is not None:
+        pool.shutdown()
 
-            if encode == 'living':
-                final_CA = CellularAutomaton_living(i, init_CA, time=100)
-            else:
-                final_CA = CellularAutomaton_pattern(i, init_CA, time=100)
-
-            new_line.append(round(fitness(final_CA), 4))
-
-        # Add new line to dataframe with rule number and their scores
-        df.loc[len(df)] = new_line
-        nb_rule += 1
-
-    df['rule'] = df['rule'].astype('int')
-    df.to_csv(os.path.join(prefix + "_generalisation.csv"), index=False) 
+    writer.close()
 
 ### Parse arguments
 if __name__ == '__main__':
@@ -70,7 +68,17 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Get performance scores from random matrices')
     parser.add_argument('-f', '--file', type=str, required=True, help='Path to JSON input file')
     parser.add_argument('-e', '--encode', type=str, choices=['living', 'pattern'], required=True, help='Select the encoding type between "living" or "pattern"')
+    parser.add_argument('--radius', type=int, default=1, help='With the living encoding, radius of the neighbourhood whose living cells are counted (1 by default)')
+    parser.add_argument('--neighbourhood', type=str, choices=['moore', 'von_neumann'], default='moore', help='With the living encoding, count the living cells of the square around the cell ("moore", by default) or at a Manhattan distance of at most RADIUS ("von_neumann")')
     parser.add_argument('--rep', type=int, default=100, help='Number of repetitions (100 by default).')
+    parser.add_argument('--seed', type=int, help='Seed of the random matrices (for reproducibility)')
+    parser.add_argument('--workers', type=int, default=1, help='Number of processes used to run the tests (1 by default).')
     args = parser.parse_args()
 
-    generalisation(json_file=args.file, encode=args.encode, rep=args.rep)
\ No newline at end of file
+    if args.radius < 1:
+        parser.error("Radius of the neighbourhood must be at least 1")
+    if args.encode == 'pattern' and (args.radius != 1 or args.neighbourhood != 'moore'):
+        parser.error("--radius and --neighbourhood require the living encoding")
+    encode = living_encoding(args.radius, args.neighbourhood) if args.encode == 'living' else args.encode
+
+    generalisation(json_file=args.file, encode=encode, rep=args.rep, seed=args.seed, workers=args.workers)
\ No newline at end of file
@@ -1,15 +1,24 @@
 from encode import *
+from rule_engine import rule_string
 from automaton_fitness import *
 from selection import *
 from crossover import *
 from mutation import *
+from parallel import *
+from racing import *
+from cache import *
+from instrumentation import *
+from results import *
+from checkpoint import *
+from summary import *
 import numpy.random as random
 import numpy as np
-import pandas as pd
 import json
 import os
 import logging
 import argparse
+import cProfile
+import pstats
 
 ### Set logging
 logger = logging.getLogger(__name__)
@@ -22,13 +31,117 @@ formatter = logging.Formatter('%(asctime)s %(message)s', datefmt='%d/%m/%Y %I:%M
 ch.setFormatter(formatter)
 logger.addHandler(ch)
 
+### Fitness evaluation
+def evaluate_population(tables, init_CA, encode, cache, pool=None, workers=1, seed=70, time=100, stats=None):
+    """
+    Evaluate a population of rules, simulating only the rules whose score is not already in the cache
+
+    Parameters :
+        - tables (np.ndarray) : lookup tables (or genomes) of the rules (N, table size)
+        - init_CA (np.ndarray) : initial matrix shared by all rules
+        - encode (str) : encoding type of the rules. Takes 2 possible values: 'living' or 'pattern'
+        - cache (FitnessCache) : cache of the scores already computed
+        - pool (ProcessPoolExecutor optional) : pool of processes used to evaluate the rules (see parallel.py)
+        - workers (int optional) : number of processes of the pool. Default = 1
+        - seed (int optional) : seed of the initial matrix. Default = 70
+        - time (int optional) : number of iterations of the simulation. Default = 100
+        - stats (dict optional) : if provided, the number of matrix updates computed and skipped are added to it (see CellularAutomaton_batch)
+
+    Return :
+        np.ndarray : N fitness scores
+    """
+    keys = [cache.key(table, seed, init_CA.shape, time, encode) for table in tables]
+
+    # Look up each distinct rule once: the copies of a rule in the population are served from its first score (cache hits)
+    rules = {}
+    for i, key in enumerate(keys):
+        rules.setdefault(key, i)
+    scores = {key: cache.get(key) for key in rules}
+    cache.hits += len(keys) - len(rules)
+
+    # Simulate each missing rule once
+    missing = {key: i for key, i in rules.items() if scores[key] is None}
+    if missing:
+        new_scores = parallel_population_fitness(pool, tables[list(missing.values())], init_CA, encode, time, workers, stats)
+        for key, score in zip(missing, new_scores):
+            cache.put(key, score)
+            scores[key] = float(score)
+
+    # The scores are not read back from the cache, which may already have evicted them
+    return np.array([scores[key] for key in keys])
+
+def record_simulation(timer, stats):
+    """
+    Add the time spent simulating and scoring the rules (measured in population_fitness, summed over the workers) to the timer
+    """
+    if 'simulation_time' in stats:
+        timer.add('simulation', stats['simulation_time'])
+        timer.add('fitness', stats['fitness_time'])
+
+### Reproduction
+def next_generation(population, fitness, selection, crossover, mutation_rate=0.1, n_select=4, N=10, timer=None, tournament_size=2):
+    """
+    Create the next population from the current rules and their fitness scores
+
+    Parameters :
+        - population (np.ndarray) : genomes of the current population (N, genome size)
+        - fitness (np.ndarray) : fitness scores of the current population
+        - selection (str) : type of selection. Takes 4 possible values: 'random', 'best', 'weighted' or 'tournament'
+        - crossover (str) : type of crossover. Takes 3 possible values: 'half', '1p' or '2p'
+        - mutation_rate (float optional) : mutation rate. Default = 0.1
+        - n_select (int optional) : number of parent rules selected. Default = 4
+        - N (int optional) : size of the new population. Default = 10
+        - timer (PhaseTimer optional) : records the selection, crossover and mutation phases (see instrumentation.py)
+        - tournament_size (int optional) : number of rules in each tournament of the 'tournament' selection. Default = 2
+
+    Return :
+        np.ndarray : genomes of the new population (N, genome size)
+    """
+    timer = timer or PhaseTimer()
+
+    # Select parent rules
+    with timer.phase('selection'):
+        if selection == 'random':
+            selected = select_random(fitness, n_select)
+        
+        elif selection == 'best':
+            selected = select_best(fitness, n_select)
+
+        elif selection == 'weighted':
+            selected = select_weighted(fitness, n_select)
+
+        else:
+            selected = select_tournament(fitness, n_select, tournament_size)
+
+    # Draw two distinct selected rules as parents of each child
+    n = len(selected)
+    first = random.randint(0, n, size=N)
+    second = (first + random.randint(1, n, size=N)) % n
+    parents1, parents2 = population[selected[first]], population[selected[second]]
+
+    # Create all new rules at once with crossover and mutation
+    with timer.phase('crossover'):
+        if crossover == 'half':
+            new_pop = crossover_half(parents1, parents2)
+
+        elif crossover == '1p':
+            new_pop = crossover_random_1p(parents1, parents2)
+        
+        else:
+            new_pop = crossover_random_2p(parents1, parents2)
+
+    with timer.phase('mutation'):
+        new_pop = mutation(new_pop, mutation_rate)
+    
+    return new_pop
+
 ### Main function 
-def genetic_algorithm(encode, selection, crossover, output, mutation_rate=0.1, N=10, n_select=4, generation=10):
+def genetic_algorithm(encode, selection, crossover, output, mutation_rate=0.1, N=10, n_select=4, generation=10, workers=1, cache_size=10000, cache_file=None, timings=False, memory=False, checkpoint=None, checkpoint_every=10, resume=False, seed=None, results_dir=None, tournament_size=2, grids=1, race_min=3, race_z=2.0, migration=None):
     """
     Select the best rule to achieve a given target
     
     Parameters :
-        - encode (str) : select the encoding type. Takes 2 possible values: 'living' or 'pattern'
+        - encode (str) : select the encoding type. Takes 2 possible values: 'living' or 'pattern'. 'living:R<radius>,N<M|N>' counts the living cells of a larger neighbourhood (see encode.living_encoding)
         - selection (str) : select the type of selection. Takes 4 possible values: 'random', 'best', 'weighted' or 'tournament'
         - crossover (str) : select the type of crossover. Takes 3 possible values: 'half', '1p' or '2p'
         - output (str) : name of the output files
@@ -36,139 +149,231 @@ def genetic_algorithm(encode, selection, crossover, output, mutation_rate=0.1, N
         - n_select (int optional) : number of parent rules selected. Default = 4
         - N (int optional) : initial population size. Default = 10
         - generation (int optional) : number of generations. Default = 10 
+        - workers (int optional) : number of processes used to evaluate the rules. Default = 1
+        - cache_size (int optional) : maximum number of fitness scores kept in the cache. Default = 10000
+        - cache_file (str optional) : path to a JSON file to load and save the cache between runs
+        - timings (bool optional) : add the time and number of calls of each phase of the generations to the csv (see instrumentation.py). Default = False
+        - memory (bool optional) : also add the peak memory allocated in each phase (slows down the run). Default = False
+        - checkpoint (str optional) : path to the checkpoint file, saved at the start of every 'checkpoint_every' generations (see checkpoint.py)
+        - checkpoint_every (int optional) : number of generations between two checkpoints. Default = 10
+        - resume (bool optional) : resume the run from the checkpoint file if it exists. Default = False
+        - seed (int optional) : seed of the random number generator (numpy.random), for reproducibility
+        - results_dir (str optional) : folder of the output files. Default = Results folder of the working directory
+        - tournament_size (int optional) : number of rules in each tournament of the 'tournament' selection. Default = 2
+        - grids (int optional) : number of initial matrices each rule is scored on (robust fitness, see racing.py). Default = 1
+        - race_min (int optional) : number of matrices evaluated by all rules before a rule can be rejected. Default = 3
+        - race_z (float optional) : width of the confidence interval of the mean score of a rule, in standard errors. Default = 2.0
+        - migration (callable optional) : called as migration(g, population, scores) after the evaluation of each generation, returns the population and scores to select from (see islands.py)
 
     Return :
         - json : 3 best rules
         - csv : fitness scores and parameters
+        - csv : statistics of the fitness scores and diversity of each generation (see summary.py)
+        - tuple : genomes and fitness scores of the 3 best rules
     """
 
     # Initialisation
     logger.info('Initialisation')
-    # Create the initial population
+    # Create the initial population (one genome per row, see encode.py)
+    if seed is not None:
+        random.seed(seed)
     g = 0
-    if encode == 'living':
-        population = [EncodingLiving() for i in range(N)]
-    else:
-        population = [EncodingPattern() for i in range(N)]
-
-    # Create empty dataframe
-    col_names = ['generation'] + ['rule_'+str(i) for i in range (1, N+1)] 
-    df = pd.DataFrame(columns=col_names)
+    population = Genome(encode, N)
 
-    # Create cellular automata
+    # Create cellular automata (the first matrix of the robust fitness is the initial matrix), without reseeding numpy.random
     init_CA = create_matrix(rows=100, columns=100, seed=70)
+    matrices = grid_matrices(grids, rows=100, columns=100, seed=70) if grids > 1 else init_CA
 
+    # Start the workers, which receive the initial matrices once
+    pool = create_pool(workers, matrices)
 
-    # Start genetic algorithm
-    while g < generation:
-        # Evaluate fitness score
-        for rule in range(N):
-            if encode == 'living':
-                final_CA = CellularAutomaton_living(population[rule], init_CA, time=100)
-            else:
-                final_CA = CellularAutomaton_pattern(population[rule], init_CA, time=100)
+    # Load the scores already computed
+    cache = FitnessCache(cache_size, cache_file)
 
-            fitness_score = fitness(final_CA)
+    # Record the phases of each generation
+    timings = timings or memory
+    timer = PhaseTimer(memory)
 
-            population[rule] = (population[rule], round(fitness_score, 4))
+    # Write the fitness scores and parameters to the csv in Results folder, by batches of generations
+    results_dir = results_dir or os.path.join(os.getcwd(), "Results")
+    os.makedirs(results_dir, exist_ok=True)
 
-        # Add fitness values to csv
-        df.loc[len(df)] = [int(g)] + [i[1] for i in population]
+    col_names = ['generation'] + ['rule_'+str(i) for i in range (1, N+1)] 
+    parameters = {'encode': encode, 'selection': selection, 'crossover': crossover, 'mutation': mutation_rate, 'N': N, 'n_select': n_select}
+    timing_names = timer.columns() if timings else []
+    timing_values = [0] * len(timing_names)
 
-        logger.info(f'generation: {g}; max fitness: {np.max([i[1] for i in population])}; mean fitness: {round(np.mean([i[1] for i in population]),2)}')
+    # Resume from the last checkpoint: restore the population, random state and cache, and remove the rows written after it
+    settings = dict(parameters, timings=timings, memory=memory, tournament_size=tournament_size, grids=grids, race_min=race_min, race_z=race_z)
+    offsets, start = [None, None], None
+    if resume and checkpoint is not None and os.path.exists(checkpoint):
+        g, population, offsets = load_checkpoint(checkpoint, encode, cache, settings)
+        start = g
+        logger.info(f'Resume from generation {g}')
 
-        # Select parent rules
-        if selection == 'random':
-            selected_rules = select_random(population, n_select)
-        
-        elif selection == 'best':
-            selected_rules = select_best(population, n_select)
+    writer = ResultWriter(os.path.join(results_dir, output + ".csv"), col_names + timing_names, parameters,
+                          integers=[name for name in timing_names if not name.endswith('_time')], offset=offsets[0])
+    summary = FitnessSummary(os.path.join(results_dir, output + "_summary.csv"), parameters, offset=offsets[1])
 
-        elif selection == 'weighted':
-            selected_rules = select_weighted(population, n_select)
 
-        else:
-            selected_rules = select_tournament(population, n_select)
-        
-        # Create new rules with crossover and mutation
-        new_pop = []
-        for i in range(N):
-            parent1, parent2 = random.choice(selected_rules, size=2, replace=False)
+    # Start genetic algorithm
+    while g < generation:
+        # Save a checkpoint (except for the generation the run was resumed from)
+        if checkpoint is not None and g % checkpoint_every == 0 and g != start:
+            save_checkpoint(checkpoint, g, population, cache, [writer.tell(), summary.tell()], settings)
+
+        # Evaluate fitness score of the whole population at once (the genomes are the lookup tables of the rules)
+        timer.reset()
+        hits, misses = cache.hits, cache.misses
+        stats = {'steps': 0, 'steps_saved': 0}
+        with timer.phase('evaluation'):
+            if grids > 1:
+                fitness_score = race_population(population, matrices, encode, cache, n_select, pool, workers, race_min=race_min, z=race_z, stats=stats)
+            else:
+                fitness_score = evaluate_population(population, init_CA, encode, cache, pool, workers, stats=stats)
+        record_simulation(timer, stats)
 
-            if crossover == 'half':
-                new_rule = crossover_half(parent1, parent2)
+        scores = np.array([round(float(score), 4) for score in fitness_score])
 
-            elif crossover == '1p':
-                new_rule = crossover_random_1p(parent1, parent2)
-            
-            else:
-                new_rule = crossover_random_2p(parent1, parent2)
+        # Add fitness values to csv
+        with timer.phase('results'):
+            writer.append([int(g)] + scores.tolist() + timing_values)
+            summary.append(g, scores, population)
 
-            new_rule = mutation(new_rule, mutation_rate)
+        logger.info(f'generation: {g}; max fitness: {np.max(scores)}; mean fitness: {round(np.mean(scores),2)}; cache hits: {cache.hits-hits}; cache misses: {cache.misses-misses}; steps saved: {stats["steps_saved"]}/{stats["steps"]+stats["steps_saved"]}')
+        if grids > 1:
+            logger.info(f'generation: {g}; grids evaluated: {stats["grids"]}/{stats["grids"]+stats["grids_saved"]}')
 
-            new_pop.append(new_rule)
-        
-        population = new_pop
+        # Exchange rules with other populations
+        if migration is not None:
+            population, scores = migration(g, population, scores)
+
+        # Select parent rules and create new rules with crossover and mutation
+        population = next_generation(population, scores, selection, crossover, mutation_rate, n_select, N, timer, tournament_size)
+
+        if timings:
+            writer.update(timer.record(), len(col_names))
+            logger.info(f'generation: {g}; {timer.summary()}')
         g = g+1
     
 
     # End genetic algorithm and evaluate the final population
-    for rule in range(N):
-        if encode == 'living':
-            final_CA = CellularAutomaton_living(population[rule], init_CA, time=100)
+    timer.reset()
+    stats = {}
+    with timer.phase('evaluation'):
+        # The 3 best rules are evaluated on all matrices
+        if grids > 1:
+            fitness_score = race_population(population, matrices, encode, cache, max(n_select, 3), pool, workers, race_min=race_min, z=race_z, stats=stats)
         else:
-            final_CA = CellularAutomaton_pattern(population[rule], init_CA, time=100)
+            fitness_score = evaluate_population(population, init_CA, encode, cache, pool, workers, stats=stats)
+    record_simulation(timer, stats)
 
-        fitness_score = fitness(final_CA)
+    scores = np.array([round(float(score), 4) for score in fitness_score])
 
-        population[rule] = (population[rule], round(fitness_score), 4)
+    if pool is not None:
+        pool.shutdown()
+    cache.save()
 
-    df.loc[len(df)] = [int(g)] + [i[1] for i in population] 
+    with timer.phase('results'):
+        writer.append([int(g)] + scores.tolist() + timing_values)
+        summary.append(g, scores, population)
 
-    best_rules = select_best(population, 3)
-    
-    # Return .json file with best rules and .csv with fitness score and parameters in Results folder
-    results_dir = os.path.join(os.getcwd(), "Results")
-    os.makedirs(results_dir, exist_ok=True)
-
-    df["encode"] = encode
-    df["selection"] = selection
-    df["crossover"] = crossover
-    df["mutation"] = mutation_rate
-    df["N"] = N
-    df["n_select"] = n_select
-
-    df.to_csv(os.path.join(results_dir, output + ".csv"), index=False) 
+    if timings:
+        writer.update(timer.record(), len(col_names))
+    writer.close()
+    summary.close()
+    timer.close()
 
+    best = select_best(scores, 3)
+    best_rules = population[best]
+    
+    # Return .json file with best rules in Results folder
     with open(os.path.join(results_dir, output + ".json"), 'w') as file:
-        json.dump([i for i in best_rules], file, indent=4)
+        json.dump([genome_to_rule(i, encode) for i in best_rules], file, indent=4)
+
+    # The living rules are outer-totalistic: log the best one in the B/S or Larger than Life notation (see RuleEngine/rule_engine.py)
+    if encode.startswith('living'):
+        logger.info(f'Best rule: {rule_string(best_rules[0], *living_neighbourhood(encode))}')
   
     logger.info('Genetic algorithm completed')
 
+    return best_rules, scores[best]
+
 ### Parse the arguments
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description='Run Genetic Algorithm')
     parser.add_argument('-e', '--encode', type=str, choices=['living', 'pattern'], required=True, help='Select the encoding type between "living" or "pattern"')
+    parser.add_argument('--radius', type=int, default=1, help='With the living encoding, radius of the neighbourhood whose living cells are counted (1 by default)')
+    parser.add_argument('--neighbourhood', type=str, choices=['moore', 'von_neumann'], default='moore', help='With the living encoding, count the living cells of the square around the cell ("moore", by default) or at a Manhattan distance of at most RADIUS ("von_neumann")')
     parser.add_argument('-s', '--selection', type=str, choices=['random', 'best', 'weighted', 'tournament'], required=True, help='Select the type of selection between "random", "best", "weighted" or "tournament"')
     parser.add_argument('-c', '--crossover', type=str, choices=['half', '1p', '2p'], required=True, help='Select the type of crossover between "half", "1p" or "2p"')
     parser.add_argument('-o', '--output', type=str, required=True, help='Name of the output files')
 
+    parser.add_argument('--tournament-size', type=int, default=2, help='Number of rules in each tournament of the tournament selection (2 by default)')
     parser.add_argument('--mutation', type=float, default=0.1, help='Set the mutation rate (0.1 by default)')
     parser.add_argument('--parents', type=int, default=4, help='Number of parent rules selected (4 by default)')
     parser.add_argument('--N', type=int, default=10, help='Initial population size (10 by default)')
     parser.add_argument('--generation', default=10, type=int, help='Number of generations (10 by default)')
+    parser.add_argument('--workers', default=1, type=int, help='Number of processes used to evaluate the rules (1 by default)')
+    parser.add_argument('--grids', default=1, type=int, help='Number of initial matrices each rule is scored on (1 by default)')
+    parser.add_argument('--race-min', default=3, type=int, help='Number of matrices evaluated by all rules before a rule can be rejected (3 by default)')
+    parser.add_argument('--race-z', default=2.0, type=float, help='Width of the confidence interval of the mean score of a rule, in standard errors (2 by default)')
+    parser.add_argument('--cache-size', default=10000, type=int, help='Maximum number of fitness scores kept in the cache (10000 by default)')
+    parser.add_argument('--cache-file', type=str, help='Path to a JSON file to load and save the fitness cache between runs')
+    parser.add_argument('--timings', action='store_true', help='Add the time and number of calls of each phase of the generations to the csv')
+    parser.add_argument('--memory', action='store_true', help='Also add the peak memory allocated in each phase (slower)')
+    parser.add_argument('--seed', type=int, help='Seed of the random number generator (for reproducibility)')
+    parser.add_argument('--checkpoint', type=str, help='Path to a checkpoint file saved during the run (Results/<output>_checkpoint.npz with --resume by default)')
+    parser.add_argument('--checkpoint-every', default=10, type=int, help='Number of generations between two checkpoints (10 by default)')
+    parser.add_argument('--resume', action='store_true', help='Resume the run from the checkpoint file if it exists')
+    parser.add_argument('--profile', type=str, help='Save a cProfile of the run to this file (read it with python -m pstats)')
     args = parser.parse_args()
 
     if args.parents > args.N:
         parser.error("Number of parents cannot exceed population size N")
+    if args.grids < 1:
+        parser.error("Number of grids must be at least 1")
+    if args.race_min < 2:
+        parser.error("Number of matrices before a rejection must be at least 2")
+    if args.radius < 1:
+        parser.error("Radius of the neighbourhood must be at least 1")
+    if args.encode == 'pattern' and (args.radius != 1 or args.neighbourhood != 'moore'):
+        parser.error("--radius and --neighbourhood require the living encoding")
+    encode = living_encoding(args.radius, args.neighbourhood) if args.encode == 'living' else args.encode
+
+    checkpoint = args.checkpoint
+    if checkpoint is None and args.resume:
+        checkpoint = os.path.join('Results', args.output + '_checkpoint.npz')
+
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
 
     genetic_algorithm(
-        encode=args.encode, 
+        encode=encode, 
         selection=args.selection, 
         crossover=args.crossover, 
         output=args.output, 
         mutation_rate=args.mutation, 
         N=args.N, 
         n_select=args.parents, 
-        generation=args.generation)
+        generation=args.generation,
+        workers=args.workers,
+        cache_size=args.cache_size,
+        cache_file=args.cache_file,
+        timings=args.timings,
+        memory=args.memory,
+        checkpoint=checkpoint,
+        checkpoint_every=args.checkpoint_every,
+        resume=args.resume,
+        seed=args.seed,
+        tournament_size=args.tournament_size,
+        grids=args.grids,
+        race_min=args.race_min,
+        race_z=args.race_z)
+
+    if args.profile:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
@@ -0,0 +1,92 @@
+from contextlib import contextmanager
+import time
+import tracemalloc
+
+"""
+Instrumentation of the genetic algorithm: wall time, number of calls and (optionally) memory allocated by each phase of a generation.
+Phases:
+    - evaluation: fitness of the population, including the cache lookups
+    - simulation: update of the cellular automata (inside evaluation, summed over the workers)
+    - fitness: fitness scores of the final matrices (inside evaluation, summed over the workers)
+    - selection, crossover, mutation: creation of the next population
+    - results: recording of the fitness scores (see results.py)
+"""
+
+PHASES = ['evaluation', 'simulation', 'fitness', 'selection', 'crossover', 'mutation', 'results']
+
+class PhaseTimer:
+    """
+    Record the time, number of calls and peak memory allocated of each phase of a generation.
+
+    Parameters:
+        - memory (bool, optional): record the peak memory allocated in each phase with tracemalloc (slows down the run). Default = False
+    """
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the phases recorded, before a new generation.
+        """
+        self.times = {}
+        self.calls = {}
+        self.allocated = {}
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Record the code run inside a with block as a call of a phase.
+        """
+        if self.memory:
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+            if self.memory:
+                allocated = tracemalloc.get_traced_memory()[1] - start_memory
+                self.allocated[name] = max(self.allocated.get(name, 0), allocated)
+
+    def add(self, name, seconds, calls=1):
+        """
+        Add time measured elsewhere (e.g. in the workers) to a phase.
+        """
+        self.times[name] = self.times.get(name, 0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + calls
+
+    def columns(self):
+        """
+        Return the names of the columns of the recorded phases (see record).
+        """
+        suffixes = ['time', 'calls'] + (['memory'] if self.memory else [])
+
+        return [f'{phase}_{suffix}' for phase in PHASES for suffix in suffixes]
+
+    def record(self):
+        """
+        Return the time (s), number of calls and peak memory allocated (bytes) of each phase, in the order of columns.
+        """
+        values = []
+        for phase in PHASES:
+            values += [round(self.times.get(phase, 0), 6), self.calls.get(phase, 0)]
+            if self.memory:
+                values.append(self.allocated.get(phase, 0))
+
+        return values
+
+    def summary(self):
+        """
+        Return a log line of the time spent in each phase.
+        """
+        return '; '.join(f'{phase}: {self.times[phase]:.3f}s' for phase in PHASES if phase in self.times)
+
+    def close(self):
+        if self.memory:
+            tracemalloc.stop()
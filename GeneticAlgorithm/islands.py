@@ -0,0 +1,335 @@
+from genetic_algorithm import *
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager, AuthenticationError, current_process
+from multiprocessing.connection import Listener, Client
+import threading
+import queue
+import time as clock
+
+"""
+Island model of the genetic algorithm: M populations (islands) evolve in parallel, each in its own process, and regularly exchange their best rules.
+The islands form a ring: every 'migrate_every' generations, each island sends copies of its best rules to the next island,
+and replaces its worst rules with the rules received from the previous island.
+The rules travel through a transport, which gives each island an endpoint with the methods:
+    - open, close: start and stop the endpoint, in the process of the island
+    - send(tag, content): send a message to the next island of the ring
+    - receive(tag): wait for the message of the previous island with this tag (the generation of the migration)
+Two transports are available:
+    - QueueTransport: queues of a multiprocessing manager, for islands running on the same machine (default)
+    - TCPTransport: TCP connections (multiprocessing.connection), for islands running on one or several machines
+"""
+
+### Transports
+class Endpoint:
+    """
+    Endpoint of an island in a transport. The messages are (tag, content) pairs, and the messages received before they are
+    expected are kept until then, so that they can arrive in any order.
+
+    Parameters:
+        - timeout (float, optional): maximum time in seconds to wait for a message. Default = 600
+    """
+
+    def __init__(self, timeout=600):
+        self.timeout = timeout
+        self.pending = {}
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def receive(self, tag):
+        """
+        Wait for the message of the previous island with the given tag and return its content.
+
+        Raises:
+            TimeoutError: if the message does not arrive in time (e.g. the previous island stopped)
+        """
+        deadline = clock.monotonic() + self.timeout
+        while tag not in self.pending:
+            try:
+                message_tag, content = self._get(max(deadline - clock.monotonic(), 0))
+            except queue.Empty:
+                raise TimeoutError(f'Message {tag} not received after {self.timeout} s') from None
+            self.pending[message_tag] = content
+
+        return self.pending.pop(tag)
+
+class QueueEndpoint(Endpoint):
+    """
+    Endpoint reading its own queue and writing to the queue of the next island (see QueueTransport).
+    """
+
+    def __init__(self, inbox, outbox, timeout=600):
+        super().__init__(timeout)
+        self.inbox = inbox
+        self.outbox = outbox
+
+    def send(self, tag, content):
+        self.outbox.put((tag, content))
+
+    def _get(self, timeout):
+        return self.inbox.get(timeout=timeout)
+
+class QueueTransport:
+    """
+    Transport between islands running on the same machine, through the queues of a multiprocessing manager (one queue per island).
+
+    Parameters:
+        - islands (int): number of islands
+    """
+
+    def __init__(self, islands):
+        self.manager = Manager()
+        self.queues = [self.manager.Queue() for _ in range(islands)]
+
+    def endpoint(self, island):
+        return QueueEndpoint(self.queues[island], self.queues[(island + 1) % len(self.queues)])
+
+    def close(self):
+        self.manager.shutdown()
+
+class TCPEndpoint(Endpoint):
+    """
+    Endpoint listening on the address of its island, in a background thread, and connecting to the address of the next island to send a message (see TCPTransport).
+    """
+
+    def __init__(self, addresses, island, authkey, timeout=600):
+        super().__init__(timeout)
+        self.address = addresses[island]
+        self.next_address = addresses[(island + 1) % len(addresses)]
+        self.authkey = authkey
+        self.listener = None
+
+    def open(self):
+        self.inbox = queue.Queue()
+        self.listener = Listener(self.address, authkey=self.authkey)
+        threading.Thread(target=self._listen, daemon=True).start()
+
+    def _listen(self):
+        while True:
+            try:
+                with self.listener.accept() as connection:
+                    self.inbox.put(connection.recv())
+            except AuthenticationError:
+                continue
+            except (OSError, EOFError):
+                return
+
+    def send(self, tag, content):
+        # The next island may not listen yet
+        deadline = clock.monotonic() + self.timeout
+        while True:
+            try:
+                with Client(self.next_address, authkey=self.authkey) as connection:
+                    connection.send((tag, content))
+                return
+            except ConnectionRefusedError:
+                if clock.monotonic() > deadline:
+                    raise TimeoutError(f'Island at {self.next_address} not reachable after {self.timeout} s') from None
+                clock.sleep(0.1)
+
+    def _get(self, timeout):
+        return self.inbox.get(timeout=timeout)
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.close()
+
+class TCPTransport:
+    """
+    Transport between islands over TCP, each island listening on its own address. The islands can run on several machines,
+    each machine running some of the islands with the same list of addresses (see the --island argument).
+
+    Parameters:
+        - addresses (list): (host, port) address of each island
+        - authkey (bytes, optional): key shared by the islands to authenticate the connections. Default = key of the current process (islands started from this process only)
+    """
+
+    def __init__(self, addresses, authkey=None):
+        self.addresses = [tuple(address) for address in addresses]
+        self.authkey = authkey or bytes(current_process().authkey)
+
+    def endpoint(self, island):
+        return TCPEndpoint(self.addresses, island, self.authkey)
+
+    def close(self):
+        pass
+
+### Migration
+class Migration:
+    """
+    Exchange of rules between an island and its neighbours, called by genetic_algorithm after the evaluation of each generation.
+
+    Parameters:
+        - endpoint (Endpoint): endpoint of the island in the transport
+        - every (int, optional): number of generations between two migrations. Default = 10
+        - migrants (int, optional): number of rules sent to the next island. Default = 2
+    """
+
+    def __init__(self, endpoint, every=10, migrants=2):
+        self.endpoint = endpoint
+        self.every = every
+        self.migrants = migrants
+
+    def __call__(self, g, population, scores):
+        if (g + 1) % self.every:
+            return population, scores
+
+        # Send copies of the best rules, and replace the worst rules with the rules of the previous island
+        best = select_best(scores, self.migrants)
+        self.endpoint.send(g, (population[best], scores[best]))
+        genomes, migrant_scores = self.endpoint.receive(g)
+
+        worst = select_best(-scores, len(genomes))
+        population, scores = population.copy(), scores.copy()
+        population[worst] = genomes
+        scores[worst] = migrant_scores
+
+        return population, scores
+
+def run_island(island, endpoint, encode, selection, crossover, output, migrate_every=10, migrants=2, quiet=False, **options):
+    """
+    Run the genetic algorithm of an island, exchanging rules through its endpoint.
+
+    Parameters:
+        - island (int): index of the island, the output files being named <output>_island<island + 1>
+        - endpoint (Endpoint): endpoint of the island in the transport
+        - encode, selection, crossover, output, options: see genetic_algorithm
+        - migrate_every, migrants: see Migration
+        - quiet (bool, optional): only log the warnings, when several islands share the terminal. Default = False
+
+    Return:
+        tuple: genomes and fitness scores of the 3 best rules of the island
+    """
+    if quiet:
+        logger.setLevel(logging.WARNING)
+    endpoint.open()
+    try:
+        return genetic_algorithm(encode, selection, crossover, f'{output}_island{island + 1}',
+                                 migration=Migration(endpoint, migrate_every, migrants), **options)
+    finally:
+        endpoint.close()
+
+def island_seeds(islands, seed=None):
+    """
+    Draw the seed of each island from one seed, so that the islands start from different populations.
+
+    Return:
+        list: one seed per island
+    """
+    if seed is None:
+        seed = int(np.random.SeedSequence().generate_state(1)[0])
+    logger.info(f'Seed of the islands: {seed}')
+
+    return [int(s) for s in np.random.SeedSequence(seed).generate_state(islands)]
+
+### Main function
+def island_model(encode, selection, crossover, output, islands=4, migrate_every=10, migrants=2, transport=None, seed=None, results_dir=None, **options):
+    """
+    Evolve several populations in parallel (one process per island), exchanging their best rules every 'migrate_every' generations.
+
+    Parameters:
+        - encode, selection, crossover, output: see genetic_algorithm
+        - islands (int, optional): number of islands. Default = 4
+        - migrate_every (int, optional): number of generations between two migrations. Default = 10
+        - migrants (int, optional): number of rules sent by each island to the next one. Default = 2
+        - transport (QueueTransport or TCPTransport, optional): transport of the rules between the islands. Default = QueueTransport
+        - seed (int, optional): seed of the seeds of the islands. If None, a seed is drawn and logged
+        - results_dir (str, optional): folder of the output files. Default = Results folder of the working directory
+        - options: other parameters of genetic_algorithm (mutation_rate, N, n_select, generation...)
+
+    Return:
+        - csv, json : fitness scores and 3 best rules of each island (<output>_island<i>, see genetic_algorithm)
+        - json : 3 best rules of all islands (<output>.json)
+    """
+    results_dir = results_dir or os.path.join(os.getcwd(), "Results")
+    seeds = island_seeds(islands, seed)
+    transport = transport or QueueTransport(islands)
+
+    try:
+        with ProcessPoolExecutor(max_workers=islands) as pool:
+            futures = [pool.submit(run_island, i, transport.endpoint(i), encode, selection, crossover, output, migrate_every, migrants,
+                                   quiet=True, seed=seeds[i], results_dir=results_dir, **options) for i in range(islands)]
+            results = [future.result() for future in futures]
+    finally:
+        transport.close()
+
+    for i, (_, scores) in enumerate(results, 1):
+        logger.info(f'island: {i}; best fitness: {scores[0]}')
+
+    # Return .json file with the best rules of all islands in Results folder
+    genomes = np.concatenate([genomes for genomes, _ in results])
+    scores = np.concatenate([scores for _, scores in results])
+    with open(os.path.join(results_dir, output + ".json"), 'w') as file:
+        json.dump([genome_to_rule(i, encode) for i in genomes[select_best(scores, 3)]], file, indent=4)
+
+    logger.info('Island model completed')
+
+### Parse the arguments
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Run the island model of the genetic algorithm')
+    parser.add_argument('-e', '--encode', type=str, choices=['living', 'pattern'], required=True, help='Select the encoding type between "living" or "pattern"')
+    parser.add_argument('--radius', type=int, default=1, help='With the living encoding, radius of the neighbourhood whose living cells are counted (1 by default)')
+    parser.add_argument('--neighbourhood', type=str, choices=['moore', 'von_neumann'], default='moore', help='With the living encoding, count the living cells of the square around the cell ("moore", by default) or at a Manhattan distance of at most RADIUS ("von_neumann")')
+    parser.add_argument('-s', '--selection', type=str, choices=['random', 'best', 'weighted', 'tournament'], required=True, help='Select the type of selection between "random", "best", "weighted" or "tournament"')
+    parser.add_argument('-c', '--crossover', type=str, choices=['half', '1p', '2p'], required=True, help='Select the type of crossover between "half", "1p" or "2p"')
+    parser.add_argument('-o', '--output', type=str, required=True, help='Name of the output files')
+
+    parser.add_argument('--islands', default=4, type=int, help='Number of islands (4 by default)')
+    parser.add_argument('--migrate-every', default=10, type=int, help='Number of generations between two migrations (10 by default)')
+    parser.add_argument('--migrants', default=2, type=int, help='Number of rules sent by each island to the next one (2 by default)')
+    parser.add_argument('--transport', type=str, choices=['queue', 'tcp'], default='queue', help='Transport of the rules between the islands ("queue" by default)')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Host of the islands with the tcp transport (127.0.0.1 by default)')
+    parser.add_argument('--port', type=int, default=6000, help='Port of the first island with the tcp transport, the next islands using the next ports (6000 by default)')
+    parser.add_argument('--addresses', nargs='+', type=str, help='host:port address of each island with the tcp transport (instead of --host and --port)')
+    parser.add_argument('--island', type=int, help='Only run this island (from 1), the other islands being run by other commands with the same --addresses')
+    parser.add_argument('--authkey', type=str, help='Key shared by the islands to authenticate the tcp connections (required with --island)')
+
+    parser.add_argument('--tournament-size', type=int, default=2, help='Number of rules in each tournament of the tournament selection (2 by default)')
+    parser.add_argument('--mutation', type=float, default=0.1, help='Set the mutation rate (0.1 by default)')
+    parser.add_argument('--parents', type=int, default=4, help='Number of parent rules selected (4 by default)')
+    parser.add_argument('--N', type=int, default=10, help='Population size of each island (10 by default)')
+    parser.add_argument('--generation', default=10, type=int, help='Number of generations (10 by default)')
+    parser.add_argument('--grids', default=1, type=int, help='Number of initial matrices each rule is scored on (1 by default)')
+    parser.add_argument('--cache-size', default=10000, type=int, help='Maximum number of fitness scores kept in the cache of each island (10000 by default)')
+    parser.add_argument('--seed', type=int, help='Seed of the seeds of the islands (for reproducibility, required with --island)')
+    args = parser.parse_args()
+
+    if args.parents > args.N:
+        parser.error("Number of parents cannot exceed population size N")
+    if args.migrants > args.N:
+        parser.error("Number of migrants cannot exceed population size N")
+    if args.radius < 1:
+        parser.error("Radius of the neighbourhood must be at least 1")
+    if args.encode == 'pattern' and (args.radius != 1 or args.neighbourhood != 'moore'):
+        parser.error("--radius and --neighbourhood require the living encoding")
+    encode = living_encoding(args.radius, args.neighbourhood) if args.encode == 'living' else args.encode
+
+    options = dict(mutation_rate=args.mutation, N=args.N, n_select=args.parents, generation=args.generation,
+                   tournament_size=args.tournament_size, grids=args.grids, cache_size=args.cache_size)
+
+    transport = None
+    if args.transport == 'tcp':
+        addresses = [(args.host, args.port + i) for i in range(args.islands)]
+        if args.addresses:
+            addresses = [(address.rsplit(':', 1)[0], int(address.rsplit(':', 1)[1])) for address in args.addresses]
+        transport = TCPTransport(addresses, args.authkey.encode() if args.authkey else None)
+
+    # Run a single island of a model spread over several commands (or machines)
+    if args.island is not None:
+        if args.transport != 'tcp' or args.authkey is None or args.seed is None:
+            parser.error("--island requires --transport tcp, --authkey and --seed")
+        if not 1 <= args.island <= len(transport.addresses):
+            parser.error("--island must be between 1 and the number of islands")
+
+        island = args.island - 1
+        seed = island_seeds(len(transport.addresses), args.seed)[island]
+        run_island(island, transport.endpoint(island), encode, args.selection, args.crossover, args.output,
+                   args.migrate_every, args.migrants, seed=seed, **options)
+
+    else:
+        island_model(encode, args.selection, args.crossover, args.output, islands=len(transport.addresses) if transport else args.islands,
+                     migrate_every=args.migrate_every, migrants=args.migrants, transport=transport, seed=args.seed, **options)
@@ -2,18 +2,18 @@ import numpy.random as random
 
 def mutation(rule, mutation_rate=0.1):
     """
-    Apply random mutations (in place) to a rule.
+    Apply random mutations (in place) to a rule, or to a stack of rules.
 
     Parameters:
-        - rule (dict): chromosome encoding the rule (set of conditions)
+        - rule (np.ndarray): genome encoding the rule (set of conditions, see encode.py), or genomes of N rules (N, genome size)
         - mutation_rate (float): probability for each condition to flip (0 -> 1 or 1 -> 0). Default = 0.1
 
     Return:
-        dict: mutated rule
+        np.ndarray: mutated genome(s)
     """
 
-    for i in rule:
-        if random.random() < mutation_rate:
-            rule[i] = (rule[i]+1) %2
+    # Draw all the conditions to flip at once
+    flip = random.random(rule.shape) < mutation_rate
+    rule ^= flip
     
-    return rule
\ No newline at end of file
+    return rule
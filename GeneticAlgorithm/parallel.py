@@ -0,0 +1,150 @@
+from automaton_fitness import *
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+"""
+Functions used to spread the fitness evaluations over a pool of processes:
+    - create_pool: start a pool of workers holding the initial matrix shared by all rules
+    - parallel_population_fitness: evaluate a population of rules, split in one chunk per worker
+    - replicate_matrices: draw the random initial matrices of the generalisation tests from one seeded generator
+    - generalisation_fitness: evaluate rules on a stack of initial matrices
+    - parallel_generalisation_fitness: evaluate rules on a stack of initial matrices, split in one chunk of (rule, matrix) pairs per worker
+"""
+
+# Initial matrix (or stack of matrices) of the worker, sent once when the worker starts instead of with every task
+_shared = {}
+
+def _init_worker(matrix):
+    """
+    Store the shared initial matrix in the worker.
+
+    Parameters:
+        - matrix (np.ndarray): initial 2D matrix, or stack of initial matrices, shared by all rules
+    """
+    _shared['matrix'] = matrix
+
+def _worker_population_fitness(tables, encode, time, grid=None):
+    """
+    Evaluate a chunk of rules from the shared initial matrix of the worker (or matrix 'grid' of the shared stack), and return the scores with the simulation statistics.
+    """
+    stats = {}
+    matrix = _shared['matrix'] if grid is None else _shared['matrix'][grid]
+    scores = population_fitness(tables, matrix, encode, time, stats=stats)
+
+    return scores, stats
+
+def create_pool(workers, matrix=None):
+    """
+    Start a pool of processes to evaluate the rules.
+
+    Parameters:
+        - workers (int): number of processes. No pool is created for a single worker
+        - matrix (np.ndarray, optional): initial 2D matrix, or stack of initial matrices, shared by all rules
+
+    Return:
+        ProcessPoolExecutor or None: the pool of processes, None if workers <= 1
+    """
+    if workers <= 1:
+        return None
+
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(matrix,))
+
+def parallel_population_fitness(pool, tables, matrix, encode, time=100, workers=1, stats=None, grid=None):
+    """
+    Evaluate a population of rules from the same initial matrix, with one chunk of rules per worker of the pool.
+
+    Parameters:
+        - pool (ProcessPoolExecutor or None): pool created with create_pool. If None, the rules are evaluated in the current process
+        - tables (np.ndarray): lookup tables of the rules (N, table size)
+        - matrix (np.ndarray): initial 2D matrix shared by all rules (already held by the workers of the pool)
+        - encode (str): encoding type of the rules. Takes 2 possible values: 'living' or 'pattern'
+        - time (int, optional): number of iterations to update the matrices. Default=100
+        - workers (int, optional): number of processes of the pool (one chunk of rules each). Default=1
+        - stats (dict, optional): if provided, the number of matrix updates computed and skipped are added to it (see CellularAutomaton_batch)
+        - grid (int, optional): if matrix is a stack of initial matrices, index of the matrix shared by all rules
+
+    Return:
+        np.ndarray: N fitness scores
+    """
+    if pool is None:
+        return population_fitness(tables, matrix if grid is None else matrix[grid], encode, time, stats=stats)
+
+    chunks = [c for c in np.array_split(tables, workers) if len(c)]
+    n = len(chunks)
+    results = list(pool.map(_worker_population_fitness, chunks, [encode] * n, [time] * n, [grid] * n))
+
+    if stats is not None:
+        for _, chunk_stats in results:
+            for key, value in chunk_stats.items():
+                stats[key] = stats.get(key, 0) + value
+
+    return np.concatenate([scores for scores, _ in results])
+
+def replicate_matrices(rep, rows=100, columns=100, seed=None):
+    """
+    Draw the random initial matrices of the generalisation tests, all at once from one seeded generator.
+
+    Parameters:
+        - rep (int): number of matrices
+        - rows (int, optional): number of rows of the matrices. Default=100
+        - columns (int, optional): number of columns of the matrices. Default=100
+        - seed (int, optional): seed of the generator. If None, fresh entropy is used
+
+    Return:
+        np.ndarray: stack of rep binary matrices (rep, rows, columns)
+    """
+    return np.random.default_rng(seed).integers(0, 2, size=(rep, rows, columns), dtype=np.uint8)
+
+def generalisation_fitness(tables, matrices, encode, time=100, pairs=None, batch=100):
+    """
+    Evaluate rules on a stack of initial matrices, simulating the (rule, matrix) pairs by stacks of 'batch' matrices.
+
+    Parameters:
+        - tables (np.ndarray): lookup tables of the rules (R, table size)
+        - matrices (np.ndarray): initial matrices shared by all rules (rep, rows, columns)
+        - encode (str): encoding type of the rules. Takes 2 possible values: 'living' or 'pattern'
+        - time (int, optional): number of iterations to update the matrices. Default=100
+        - pairs (np.ndarray, optional): indices of the pairs to evaluate, pair p being rule p // rep on matrix p % rep. Default = all R * rep pairs
+        - batch (int, optional): number of pairs simulated together (bounds the memory used). Default=100
+
+    Return:
+        np.ndarray: one fitness score per pair
+    """
+    rep = len(matrices)
+    if pairs is None:
+        pairs = np.arange(len(tables) * rep)
+
+    scores = [fitness_batch(CellularAutomaton_batch(tables[p // rep], matrices[p % rep], encode, time))
+              for p in (pairs[i:i+batch] for i in range(0, len(pairs), batch))]
+
+    return np.concatenate(scores) if scores else np.zeros(0)
+
+def _worker_generalisation_fitness(tables, encode, time, pairs):
+    """
+    Evaluate a chunk of (rule, matrix) pairs on the matrices shared with the worker.
+    """
+    return generalisation_fitness(tables, _shared['matrix'], encode, time, pairs)
+
+def parallel_generalisation_fitness(pool, tables, matrices, encode, time=100, workers=1):
+    """
+    Evaluate each rule on each initial matrix, with one chunk of (rule, matrix) pairs per worker of the pool (see generalisation_fitness).
+
+    Parameters:
+        - pool (ProcessPoolExecutor or None): pool created with create_pool(workers, matrices). If None, the rules are evaluated in the current process
+        - tables, matrices, encode, time: see generalisation_fitness
+        - workers (int, optional): number of processes of the pool (one chunk of pairs each). Default=1
+
+    Return:
+        np.ndarray: fitness scores of each rule on each matrix (R, rep)
+    """
+    tables = np.atleast_2d(tables)
+    shape = (len(tables), len(matrices))
+
+    if pool is None:
+        return generalisation_fitness(tables, matrices, encode, time).reshape(shape)
+
+    chunks = [c for c in np.array_split(np.arange(shape[0] * shape[1]), workers) if len(c)]
+    n = len(chunks)
+    scores = pool.map(_worker_generalisation_fitness, [tables] * n, [encode] * n, [time] * n, chunks)
+
+    return np.concatenate(list(scores)).reshape(shape)
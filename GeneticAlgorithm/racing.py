@@ -0,0 +1,122 @@
+from parallel import *
+import numpy as np
+
+"""
+Robust fitness of the rules: each rule is scored on K initial matrices instead of a single one, and its fitness is its mean score.
+To avoid K full simulations per rule, the rules are raced: the matrices are evaluated one after the other, and a rule leaves the race
+as soon as its mean score is confidently below the selection cutoff:
+    - from 'race_min' matrices on, the mean score of each rule is known up to z standard errors
+    - the cutoff is the n-th highest lower bound (mean - z * standard error) of the rules still in the race
+    - a rule whose upper bound (mean + z * standard error) is below the cutoff is rejected, and its fitness is the mean of the matrices already evaluated
+The n best rules, and all the rules that could still be among them, are evaluated on all K matrices.
+"""
+
+def grid_matrices(grids, rows=100, columns=100, seed=70):
+    """
+    Create the initial matrices of the robust fitness, matrix k being create_matrix(rows, columns, seed + k).
+
+    Parameters:
+        - grids (int): number of matrices K
+        - rows (int, optional): number of rows of the matrices. Default = 100
+        - columns (int, optional): number of columns of the matrices. Default = 100
+        - seed (int, optional): seed of the first matrix. Default = 70
+
+    Return:
+        np.ndarray: stack of K binary matrices (K, rows, columns)
+    """
+    return np.stack([np.random.RandomState(seed + k).randint(0, 2, size=(rows, columns)) for k in range(grids)])
+
+def reject_rules(scores, racing, n, z=2.0):
+    """
+    Remove from the race the rules whose mean score is confidently below the n-th best one.
+
+    Parameters:
+        - scores (np.ndarray): scores of the rules on the matrices evaluated so far (R, k), with k >= 2
+        - racing (np.ndarray): boolean mask of the rules still in the race (R)
+        - n (int): number of rules kept by the selection
+        - z (float, optional): width of the confidence interval of the mean, in standard errors. Default = 2.0
+
+    Return:
+        np.ndarray: boolean mask of the rules still in the race after the rejection
+    """
+    if racing.sum() <= n:
+        return racing
+
+    candidates = np.flatnonzero(racing)
+    mean = scores[candidates].mean(axis=1)
+    margin = z * scores[candidates].std(axis=1, ddof=1) / np.sqrt(scores.shape[1])
+    cutoff = np.partition(mean - margin, -n)[-n]
+
+    racing = racing.copy()
+    racing[candidates[mean + margin < cutoff]] = False
+
+    return racing
+
+def race_population(tables, matrices, encode, cache, n, pool=None, workers=1, seed=70, time=100, race_min=3, z=2.0, stats=None):
+    """
+    Evaluate a population of rules on a stack of initial matrices, racing the rules against the selection cutoff (see reject_rules).
+    The scores of each rule on each matrix are cached, so that a rule already raced is not simulated again.
+
+    Parameters:
+        - tables (np.ndarray): lookup tables (or genomes) of the rules (N, table size)
+        - matrices (np.ndarray): stack of initial matrices shared by all rules (K, rows, columns), matrix k having the seed seed + k (see grid_matrices)
+        - encode (str): encoding type of the rules. Takes 2 possible values: 'living' or 'pattern'
+        - cache (FitnessCache): cache of the scores already computed
+        - n (int): number of rules kept by the selection, evaluated on all matrices
+        - pool (ProcessPoolExecutor, optional): pool of processes holding the stack of matrices (see parallel.py)
+        - workers (int, optional): number of processes of the pool. Default = 1
+        - seed (int, optional): seed of the first matrix. Default = 70
+        - time (int, optional): number of iterations of the simulation. Default = 100
+        - race_min (int, optional): number of matrices evaluated by all rules before the first rejection (at least 2). Default = 3
+        - z (float, optional): width of the confidence interval of the mean, in standard errors. Default = 2.0
+        - stats (dict, optional): if provided, the number of matrix updates computed and skipped are added to it (see CellularAutomaton_batch),
+          with the number of (rule, matrix) pairs evaluated ('grids') and skipped ('grids_saved')
+
+    Return:
+        np.ndarray: N fitness scores (mean score of each rule on the matrices it was evaluated on)
+
+    Raises:
+        ValueError: if race_min < 2 (the standard error needs at least 2 scores)
+    """
+    if race_min < 2:
+        raise ValueError(f'race_min must be at least 2, got {race_min}')
+
+    K = len(matrices)
+    shape = matrices.shape[1:]
+
+    # Race each distinct rule once, even if it appears several times in the population
+    keys = [cache.key(table, seed, shape, time, encode) for table in tables]
+    rules = {}
+    for i, key in enumerate(keys):
+        rules.setdefault(key, i)
+    distinct = tables[list(rules.values())]
+    cache.hits += len(keys) - len(rules)
+
+    scores = np.full((len(distinct), K), np.nan)
+    racing = np.ones(len(distinct), dtype=bool)
+
+    for k in range(K):
+        candidates = np.flatnonzero(racing)
+        grid_keys = [cache.key(distinct[i], seed + k, shape, time, encode) for i in candidates]
+        scores[candidates, k] = np.array([cache.get(key) for key in grid_keys], dtype=float)
+
+        # Simulate the rules still in the race whose score on this matrix is not in the cache
+        missing = np.isnan(scores[candidates, k])
+        if missing.any():
+            new_scores = parallel_population_fitness(pool, distinct[candidates[missing]], matrices, encode, time, workers, stats, grid=k)
+            scores[candidates[missing], k] = new_scores
+            for key, score in zip([key for key, m in zip(grid_keys, missing) if m], new_scores):
+                cache.put(key, score)
+
+        if race_min <= k + 1 < K:
+            racing = reject_rules(scores[:, :k+1], racing, n, z)
+
+    if stats is not None:
+        evaluated = int(np.sum(~np.isnan(scores)))
+        stats['grids'] = stats.get('grids', 0) + evaluated
+        stats['grids_saved'] = stats.get('grids_saved', 0) + scores.size - evaluated
+
+    fitness = np.nanmean(scores, axis=1)
+    position = {key: j for j, key in enumerate(rules)}
+
+    return fitness[[position[key] for key in keys]]
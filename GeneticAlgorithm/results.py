@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import os
+
+"""
+Results of the scripts (fitness scores of each generation, generalisation scores of each rule), written to a CSV file while the run goes on.
+The rows are stored in a preallocated buffer and appended to the file by batches, so that:
+    - adding a row does not copy the rows already recorded
+    - the rows of the finished batches are already on disk during a long run
+"""
+
+class ResultWriter:
+    """
+    Buffer of numerical rows, appended to a CSV file every 'batch' rows.
+
+    Parameters:
+        - path (str): path to the CSV file (overwritten)
+        - columns (list): names of the numerical columns
+        - constants (dict, optional): columns holding the same value in every row, added after the numerical columns (e.g. the parameters of the run)
+        - integers (list, optional): numerical columns written as integers
+        - batch (int, optional): number of rows kept in memory before they are written. Default = 100
+        - offset (int, optional): to resume a run, keep the first 'offset' bytes of the file (see tell) instead of overwriting it
+    """
+
+    def __init__(self, path, columns, constants=None, integers=(), batch=100, offset=None):
+        self.path = path
+        self.columns = list(columns)
+        self.constants = constants or {}
+        self.integers = list(integers)
+        self.buffer = np.empty((batch, len(self.columns)), dtype=float)
+        self.n = 0
+
+        # Write the header, so that the file is complete after each batch
+        if offset is None:
+            pd.DataFrame(columns=self.columns + list(self.constants)).to_csv(path, index=False)
+
+        # Remove the rows written after the offset
+        else:
+            with open(path, 'r+b') as file:
+                file.truncate(offset)
+
+    def append(self, row):
+        """
+        Add a row. The previous batch is written first if the buffer is full, so the last row can still be updated (see update).
+        """
+        if self.n == len(self.buffer):
+            self.flush()
+
+        self.buffer[self.n] = row
+        self.n += 1
+
+    def update(self, values, start):
+        """
+        Overwrite the values of the last row from the column of index 'start'.
+        """
+        self.buffer[self.n - 1, start:start + len(values)] = values
+
+    def flush(self):
+        """
+        Append the rows of the buffer to the file.
+        """
+        if self.n == 0:
+            return
+
+        df = pd.DataFrame(self.buffer[:self.n], columns=self.columns)
+        for column in self.integers:
+            df[column] = df[column].astype('int')
+        for column, value in self.constants.items():
+            df[column] = value
+
+        df.to_csv(self.path, mode='a', header=False, index=False)
+        self.n = 0
+
+    def tell(self):
+        """
+        Write the buffer and return the size of the file in bytes.
+        """
+        self.flush()
+
+        return os.path.getsize(self.path)
+
+    def close(self):
+        self.flush()
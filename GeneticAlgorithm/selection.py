@@ -1,90 +1,105 @@
 import numpy as np
 import numpy.random as random
 """
-Functions used to select rules:
+Functions used to select rules, from the array of fitness scores of the population. They return the indices of the selected rules:
     - select_random: randomly select the rules
     - select_best: select rules with the highest fitness score
     - select_weighted: randomly select rules weighted by their fitness score
-    - select_tournament: randomly select two rules and choose the one with the higher fitness
+    - select_tournament: randomly select k rules and choose the one with the highest fitness, for each selected rule
 """
 
-def select_random(population_fitness, n=4):
+def select_random(fitness, n=4):
     """
     Randomly select a number of rules from a population.
-    
+
     Parameters:
-        - population (list): set of rules and their fitness score
+        - fitness (np.ndarray): fitness scores of the population
         - n (int): number of rules selected. Default = 4
 
     Return:
-        list: n randomly selected rules
+        np.ndarray: indices of n distinct randomly selected rules
     """
-    rules = [i[0] for i in population_fitness]
-    selected_rules = list(random.choice(rules, size=n, replace=False))
+    selected = random.choice(len(fitness), size=n, replace=False)
 
-    return selected_rules
+    return selected
 
 
-def select_best(population_fitness, n=4):
+def select_best(fitness, n=4):
     """
     Select the rules with the highest fitness scores
-    
+
     Parameters:
-        - population_fitness (list): set of rules and their fitness score
+        - fitness (np.ndarray): fitness scores of the population
         - n (int): number of rules selected. Default = 4
-    
+
     Return:
-        list: n best rules
+        np.ndarray: indices of the n best rules, from the best one
     """
+    fitness = np.asarray(fitness)
+    n = min(n, len(fitness))
 
-    population_fitness.sort(key=lambda tup: tup[1], reverse=True)
-    selected_rules = [i[0] for i in population_fitness[0:n]] 
+    # Find the n best rules without sorting the whole population, then sort them
+    best = np.argpartition(-fitness, n - 1)[:n]
+    selected = best[np.argsort(-fitness[best], kind='stable')]
 
-    return selected_rules
+    return selected
 
 
-def select_weighted(population_fitness, n=4):
+def select_weighted(fitness, n=4, replace=False):
     """
     Randomly select rules weighted by their fitness score
-    
+
     Parameters:
-        - population_fitness (list): set of rules and their fitness score
+        - fitness (np.ndarray): fitness scores of the population
         - n (int): number of rules selected. Default = 4
-    
+        - replace (bool): whether a rule can be selected several times. Default = False
+
     Return:
-        list: n distinct rules
+        np.ndarray: indices of n rules (distinct unless replace is True)
     """
-
-    rules = [i[0] for i in population_fitness]
     eps = 0.001 # prevent the division by 0
-    fitness = [i[1]+eps for i in population_fitness] 
-    weight = [i/sum(fitness) for i in fitness]
+    weight = np.asarray(fitness, dtype=float) + eps
+
+    # With replacement: search random positions in the cumulative weights
+    if replace:
+        cumulative = np.cumsum(weight)
+        selected = np.searchsorted(cumulative, random.random(n) * cumulative[-1], side='right')
+        return np.minimum(selected, len(weight) - 1)
 
-    selected_rules = list(random.choice(rules, size=n, replace=False, p=weight))
+    # Without replacement: keep the n largest keys u^(1/weight) (Efraimidis-Spirakis), computed as log(u) / weight
+    keys = np.log(random.random(len(weight))) / weight
+    selected = np.argpartition(-keys, n - 1)[:n]
 
-    return selected_rules
+    return selected
 
 
-def select_tournament(population_fitness, n=4):
+def select_tournament(fitness, n=4, k=2):
     """
-    Randomly select two rules and choose the rule with the higher fitness
-    
+    For each selected rule, randomly select k distinct rules and choose the rule with the highest fitness.
+    Ties go to the rule drawn last
+
     Parameters:
-        - population_fitness (list): set of rules and their fitness score
+        - fitness (np.ndarray): fitness scores of the population
         - n (int): number of rules selected. Default = 4
-    
+        - k (int): number of rules in each tournament. Default = 2
+
     Return:
-        list: n distinct rules
+        np.ndarray: indices of n rules (a rule can win several tournaments)
     """
-    selected_rules = []
-
-    for i in range(n):
-        competitors = random.choice(np.arange(len(population_fitness)),2, replace=False)
-
-        if population_fitness[competitors[0]][1]>population_fitness[competitors[1]][1]:
-            selected_rules.append(population_fitness[competitors[0]][0])
-        else:
-            selected_rules.append(population_fitness[competitors[1]][0])
-
-    return selected_rules
-
+    fitness = np.asarray(fitness)
+    k = min(k, len(fitness))
+
+    # All tournaments at once: one row of k distinct competitors per tournament.
+    # The j-th competitor is drawn among the len(fitness) - j rules left, then shifted past the rules already drawn
+    competitors = np.empty((n, k), dtype=int)
+    for j in range(k):
+        drawn = random.randint(0, len(fitness) - j, size=n)
+        for previous in np.sort(competitors[:, :j], axis=1).T:
+            drawn += drawn >= previous
+        competitors[:, j] = drawn
+
+    # The last competitor with the highest fitness wins
+    winners = k - 1 - np.argmax(fitness[competitors][:, ::-1], axis=1)
+    selected = competitors[np.arange(n), winners]
+
+    return selected
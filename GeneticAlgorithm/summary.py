@@ -0,0 +1,77 @@
+from results import *
+import numpy as np
+import pandas as pd
+
+"""
+Summary of the fitness scores of each generation, computed while the genetic algorithm runs and written to <output>_summary.csv.
+It holds one row per generation whatever the size of the population, so that many runs can be analysed without reading all their scores:
+    - mean, variance, minimum, maximum and quantiles of the fitness scores of the generation
+    - best fitness since the start of the run
+    - diversity of the genomes: fraction of distinct genomes, and mean Hamming distance between two genomes (as a fraction of the genes)
+"""
+
+QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+SUMMARY_COLUMNS = ['generation', 'mean', 'variance', 'min', 'max'] + [f'q{round(100 * q)}' for q in QUANTILES] + ['best', 'distinct', 'diversity']
+
+def genome_diversity(population):
+    """
+    Measure the diversity of a population of binary genomes, without comparing the genomes two by two.
+
+    Parameters:
+        - population (np.ndarray): genomes of the population (N, genome size)
+
+    Return:
+        tuple: fraction of distinct genomes, and mean Hamming distance between two genomes of the population (fraction of the genes)
+    """
+    n = len(population)
+    distinct = len(np.unique(population, axis=0)) / n
+    if n < 2:
+        return distinct, 0.0
+
+    # Two genomes drawn without replacement differ at a gene with probability 2 p (1 - p) n / (n - 1), p being the frequency of 1 at this gene
+    p = population.mean(axis=0)
+    diversity = float(np.mean(2 * p * (1 - p)) * n / (n - 1))
+
+    return distinct, diversity
+
+class FitnessSummary:
+    """
+    Statistics of the fitness scores of each generation, appended to a CSV file by batches of generations (see ResultWriter).
+
+    Parameters:
+        - path (str): path to the CSV file (overwritten)
+        - constants (dict, optional): parameters of the run, added to each row
+        - offset (int, optional): to resume a run, keep the first 'offset' bytes of the file (see ResultWriter.tell) instead of overwriting it
+    """
+
+    def __init__(self, path, constants=None, offset=None):
+        self.writer = ResultWriter(path, SUMMARY_COLUMNS, constants, integers=['generation'], offset=offset)
+        self.best = -np.inf
+
+        # The best fitness since the start of the run is in the last row kept
+        if offset is not None:
+            best = pd.read_csv(path, usecols=['best'])['best']
+            if len(best):
+                self.best = float(best.iloc[-1])
+
+    def append(self, g, scores, population):
+        """
+        Add the statistics of a generation.
+
+        Parameters:
+            - g (int): generation
+            - scores (np.ndarray): fitness scores of the population
+            - population (np.ndarray): genomes of the population (N, genome size)
+        """
+        scores = np.asarray(scores, dtype=float)
+        self.best = max(self.best, float(scores.max()))
+        distinct, diversity = genome_diversity(population)
+
+        row = [g, scores.mean(), scores.var(), scores.min(), scores.max()] + np.quantile(scores, QUANTILES).tolist() + [self.best, distinct, diversity]
+        self.writer.append(np.round(row, 6))
+
+    def tell(self):
+        return self.writer.tell()
+
+    def close(self):
+        self.writer.close()
@@ -0,0 +1,81 @@
+import os
+import sys
+import socket
+import threading
+import numpy as np
+import pytest
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from islands import QueueTransport, TCPTransport, Migration
+
+"""
+Loopback tests of the island transports: two islands of a ring exchange their best rules, each in its own thread,
+and the rules received must replace the worst rules of the island.
+"""
+
+def free_ports(n):
+    """
+    Return n ports of the loopback interface that are not in use.
+    """
+    sockets = [socket.socket() for _ in range(n)]
+    for s in sockets:
+        s.bind(('127.0.0.1', 0))
+    ports = [s.getsockname()[1] for s in sockets]
+    for s in sockets:
+        s.close()
+
+    return ports
+
+def migrate(endpoints, g, every=2, migrants=2):
+    """
+    Call the migration of two islands at generation g, each in its own thread, and return their new populations and scores.
+    Island i has a population of 5 genomes filled with 10 * i + j (j = index of the rule) and the scores j (island 0) or 4 - j (island 1).
+    """
+    populations = [np.arange(5, dtype=np.uint8)[:, None].repeat(3, axis=1) + 10 * i for i in range(2)]
+    scores = [np.arange(5, dtype=float), np.arange(5, dtype=float)[::-1].copy()]
+    results = [None, None]
+
+    def run(i):
+        endpoints[i].open()
+        try:
+            results[i] = Migration(endpoints[i], every, migrants)(g, populations[i], scores[i])
+        finally:
+            endpoints[i].close()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+    assert all(result is not None for result in results)
+
+    return results
+
+@pytest.fixture(params=['queue', 'tcp'])
+def transport(request):
+    if request.param == 'queue':
+        transport = QueueTransport(2)
+    else:
+        transport = TCPTransport([('127.0.0.1', port) for port in free_ports(2)], b'test')
+    yield transport
+    transport.close()
+
+def test_migrants_replace_worst_rules(transport):
+    endpoints = [transport.endpoint(i) for i in range(2)]
+    for endpoint in endpoints:
+        endpoint.timeout = 10
+    (population_0, scores_0), (population_1, scores_1) = migrate(endpoints, g=1)
+
+    # Island 0 (worst rules 0 and 1) receives the best rules of island 1 (rules 0 and 1, genomes 10 and 11, scores 4 and 3)
+    assert sorted(population_0[:2, 0]) == [10, 11]
+    assert sorted(scores_0[:2]) == [3, 4]
+    assert (population_0[2:, 0] == [2, 3, 4]).all()
+
+    # Island 1 (worst rules 3 and 4) receives the best rules of island 0 (rules 3 and 4, genomes 3 and 4, scores 3 and 4)
+    assert sorted(population_1[3:, 0]) == [3, 4]
+    assert sorted(scores_1[3:]) == [3, 4]
+    assert (population_1[:3, 0] == [10, 11, 12]).all()
+
+def test_no_migration_between_migrations(transport):
+    endpoints = [transport.endpoint(i) for i in range(2)]
+    for i, (population, scores) in enumerate(migrate(endpoints, g=0)):
+        assert (population[:, 0] == np.arange(5) + 10 * i).all()
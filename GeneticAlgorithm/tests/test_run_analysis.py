@@ -0,0 +1,33 @@
+import os
+import sys
+import pytest
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Supplementary'))
+from experiments import sweep_runs
+from run_analysis import run_parameters, group_runs
+
+"""
+Tests of the grouping of the runs by run_analysis.py, on the names of the runs of experiments.py.
+"""
+
+GRID = {'encode': ['living'], 'selection': ['best', 'tournament'], 'crossover': ['half'], 'mutation': [0.01, 0.1], 'n_select': [4], 'N': [10]}
+
+def test_run_parameters_of_sweep_names():
+    for parameters in sweep_runs(GRID, replicates=2, generation=20):
+        read = run_parameters(parameters['output'])
+        assert read == {name: str(parameters[name]) for name in ['encode', 'selection', 'crossover', 'mutation', 'n_select', 'N', 'generation', 'replicate']}
+
+def test_group_sweep_runs():
+    runs = [parameters['output'] for parameters in sweep_runs(GRID, replicates=2)]
+
+    # Default: first parameter taking several values, replicates excluded
+    assert sorted(group_runs(runs).unique()) == ['best', 'tournament']
+    assert sorted(group_runs(runs, 'mutation').unique()) == ['0.01', '0.1']
+
+    # Sweep of the mutation rate only
+    runs = [parameters['output'] for parameters in sweep_runs(dict(GRID, selection=['best']), replicates=2)]
+    assert sorted(group_runs(runs).unique()) == ['0.01', '0.1']
+
+def test_group_other_names():
+    assert group_runs(['selection_best_rep1', 'selection_random_rep1']).to_dict() == {'selection_best_rep1': 'best', 'selection_random_rep1': 'random'}
+    with pytest.raises(ValueError):
+        group_runs(['selection_best_rep1'], 'mutation')
@@ -0,0 +1,353 @@
+import numpy as np
+import argparse
+import json
+
+"""
+Rule engine shared by the Game of Life and the genetic algorithm: it updates binary cellular automata according to any outer-totalistic rule,
+where the new state of a cell only depends on its state and on the number of living cells in its neighbourhood.
+
+Rules are given as strings, in one of two notations:
+    - B/S notation for the 8 surrounding cells: 'B3/S23' is Conway's Game of Life (birth with 3 living neighbours, survival with 2 or 3).
+      A final 'V' uses the 4 orthogonal neighbours instead (von Neumann neighbourhood), e.g. 'B2/S013V'
+    - Larger than Life notation for neighbourhoods of any radius, e.g. 'R5,C2,M1,S34..58,B34..45,NM' (Bosco's rule):
+      radius R, number of states C (only 2, or 0 for 2), M1 if the cell counts itself in its neighbourhood, survival S and birth B counts,
+      and neighbourhood NM (Moore: square of (2R+1) x (2R+1) cells) or NN (von Neumann: cells at a Manhattan distance of at most R).
+      The counts are lists of values and ranges separated by commas, a range written 'a..b' or 'a-b'
+
+The matrices can be a torus (the cells of the last row are neighbours of the first row, same for the columns) or have fixed boundaries (the cells outside are always dead).
+The living neighbours are counted with separable sums: the matrix is summed over 2R+1 shifted rows, then the result over 2R+1 shifted columns,
+so the cost of an update grows with R instead of the (2R+1)^2 cells of the neighbourhood.
+A rule is then applied as a lookup table of 2 * (neighbourhood size + 1) entries, the index of a cell being (neighbourhood size + 1) * cell + number of living neighbours.
+"""
+
+LIFE = 'B3/S23'
+NEIGHBOURHOODS = ['moore', 'von_neumann']
+BOUNDARIES = ['torus', 'fixed']
+
+### Neighbourhoods
+def neighbourhood_size(radius=1, neighbourhood='moore'):
+    """
+    Count the cells of a neighbourhood, without the cell itself.
+
+    Parameters:
+        radius (int optional): Radius of the neighbourhood. Default is 1.
+        neighbourhood (str optional): 'moore' or 'von_neumann'. Default is 'moore'.
+
+    Returns:
+        int: The number of neighbours of a cell (8 for the Moore neighbourhood of radius 1).
+
+    Raises:
+        ValueError: If the radius is smaller than 1 or the neighbourhood is unknown.
+    """
+
+    if radius < 1:
+        raise ValueError(f'The radius of the neighbourhood must be at least 1, not {radius}.')
+    if neighbourhood == 'moore':
+        return (2 * radius + 1) ** 2 - 1
+    if neighbourhood == 'von_neumann':
+        return 2 * radius * (radius + 1)
+
+    raise ValueError(f'Unknown neighbourhood {neighbourhood!r}, use one of {NEIGHBOURHOODS}.')
+
+
+def parse_neighbourhood(spec):
+    """
+    Read a neighbourhood written as in the Larger than Life notation, e.g. 'R2,NN'.
+
+    Parameters:
+        spec (str): Radius 'R<radius>' and neighbourhood 'NM' (Moore) or 'NN' (von Neumann), separated by a comma. Both are optional.
+
+    Returns:
+        tuple: The radius and the neighbourhood ('moore' or 'von_neumann').
+
+    Raises:
+        ValueError: If the neighbourhood cannot be read.
+    """
+
+    radius, neighbourhood = 1, 'moore'
+    for field in spec.upper().replace(' ', '').split(','):
+        if field[:1] == 'R' and field[1:].isdigit():
+            radius = int(field[1:])
+        elif field in ('NM', 'NN'):
+            neighbourhood = 'moore' if field == 'NM' else 'von_neumann'
+        elif field:
+            raise ValueError(f'Cannot read the neighbourhood {spec!r}: use a radius R<r> and NM (Moore) or NN (von Neumann), e.g. "R2,NN".')
+
+    neighbourhood_size(radius, neighbourhood)
+
+    return radius, neighbourhood
+
+
+### Rules
+def _counts(values, rule):
+    """
+    Read a list of numbers of living neighbours: values 'a' and ranges 'a..b' or 'a-b'.
+    """
+
+    counts = set()
+    for value in values:
+        low, separator, high = value.replace('..', '-').partition('-')
+        if not low.isdigit() or (separator and not high.isdigit()):
+            raise ValueError(f'Cannot read the counts {value!r} of the rule {rule!r}.')
+        counts.update(range(int(low), int(high if separator else low) + 1))
+
+    return counts
+
+
+def parse_rule(rule):
+    """
+    Read a rule written in the B/S or Larger than Life notation (see above).
+
+    Parameters:
+        rule (str): The rule, e.g. 'B3/S23' or 'R5,C2,M1,S34..58,B34..45,NM'.
+
+    Returns:
+        dict: The rule: numbers of living neighbours giving birth to a dead cell ('birth') and keeping a living cell alive ('survival'),
+        without counting the cell itself, and its 'radius' and 'neighbourhood'.
+
+    Raises:
+        ValueError: If the rule cannot be read, has more than two states, or a count is larger than the neighbourhood.
+    """
+
+    text = rule.upper().replace(' ', '')
+    radius, neighbourhood, middle = 1, 'moore', 0
+    fields = {'B': [], 'S': []}
+
+    if '/' in text:
+        # B/S notation, with a final V for the von Neumann neighbourhood
+        if text.endswith('V'):
+            text, neighbourhood = text[:-1], 'von_neumann'
+        parts = dict((part[:1], part[1:]) for part in text.split('/'))
+        if sorted(parts) != ['B', 'S'] or not all(value.isdigit() or value == '' for value in parts.values()):
+            raise ValueError(f'Cannot read the rule {rule!r}: use the B/S notation (e.g. "B3/S23") or the Larger than Life notation (e.g. "R2,C2,M0,S6..9,B7..8,NM").')
+        fields = {key: list(value) for key, value in parts.items()}
+
+    else:
+        # Larger than Life notation: the values without letter belong to the previous field (S or B)
+        field = None
+        for token in text.split(','):
+            key, value = token[:1], token[1:]
+            if key in ('B', 'S'):
+                field = key
+                if value:
+                    fields[key].append(value)
+            elif token[:1].isdigit() and field is not None:
+                fields[field].append(token)
+            elif key == 'R' and value.isdigit():
+                radius, field = int(value), None
+            elif key == 'C' and value.isdigit():
+                if int(value) > 2:
+                    raise ValueError(f'The rule {rule!r} has {value} states: only rules with two states are supported.')
+                field = None
+            elif key == 'M' and value in ('0', '1'):
+                middle, field = int(value), None
+            elif token in ('NM', 'NN'):
+                neighbourhood, field = 'moore' if token == 'NM' else 'von_neumann', None
+            else:
+                raise ValueError(f'Cannot read the rule {rule!r}: use the B/S notation (e.g. "B3/S23") or the Larger than Life notation (e.g. "R2,C2,M0,S6..9,B7..8,NM").')
+
+    size = neighbourhood_size(radius, neighbourhood)
+    birth = _counts(fields['B'], rule)
+
+    # With M1, a living cell counts itself: survival with s cells in the neighbourhood means s - 1 living neighbours
+    survival = {count - middle for count in _counts(fields['S'], rule)} - {-1}
+
+    if max(birth | survival, default=0) > size:
+        raise ValueError(f'The rule {rule!r} has counts larger than the {size} cells of its neighbourhood.')
+
+    return {'birth': sorted(birth), 'survival': sorted(survival), 'radius': radius, 'neighbourhood': neighbourhood}
+
+
+def lookup_table(rule):
+    """
+    Convert a rule into a lookup table.
+
+    Parameters:
+        rule (str or dict): The rule, as a string or read by parse_rule.
+
+    Returns:
+        numpy.ndarray: uint8 vector giving the new state of a cell for each index (neighbourhood size + 1) * cell + number of living neighbours.
+    """
+
+    if isinstance(rule, str):
+        rule = parse_rule(rule)
+
+    size = neighbourhood_size(rule['radius'], rule['neighbourhood'])
+    table = np.zeros(2 * (size + 1), dtype=np.uint8)
+    table[rule['birth']] = 1
+    table[[size + 1 + count for count in rule['survival']]] = 1
+
+    return table
+
+
+def _ranges(counts):
+    """
+    Write a list of counts with ranges, e.g. [2, 3, 4, 6] as '2..4,6'.
+    """
+
+    parts = []
+    for count in counts:
+        if parts and parts[-1][1] == count - 1:
+            parts[-1][1] = count
+        else:
+            parts.append([count, count])
+
+    return ','.join(str(low) if low == high else f'{low}..{high}' for low, high in parts)
+
+
+def rule_string(table, radius=1, neighbourhood='moore'):
+    """
+    Write the rule of a lookup table (see lookup_table) as a string: in the B/S notation for radius 1, in the Larger than Life notation otherwise.
+
+    Parameters:
+        table (numpy.ndarray): The lookup table of the rule, e.g. the genome of a rule found by the genetic algorithm with the 'living' encoding.
+        radius (int optional): Radius of the neighbourhood. Default is 1.
+        neighbourhood (str optional): 'moore' or 'von_neumann'. Default is 'moore'.
+
+    Returns:
+        str: The rule, readable by parse_rule.
+
+    Raises:
+        ValueError: If the size of the table does not match the neighbourhood.
+    """
+
+    size = neighbourhood_size(radius, neighbourhood)
+    table = np.asarray(table)
+    if len(table) != 2 * (size + 1):
+        raise ValueError(f'A table of {len(table)} entries does not match a neighbourhood of {size} cells.')
+
+    birth = np.flatnonzero(table[:size + 1]).tolist()
+    survival = np.flatnonzero(table[size + 1:]).tolist()
+
+    if radius == 1:
+        return 'B' + ''.join(map(str, birth)) + '/S' + ''.join(map(str, survival)) + ('V' if neighbourhood == 'von_neumann' else '')
+
+    return f"R{radius},C2,M0,S{_ranges(survival)},B{_ranges(birth)},{'NM' if neighbourhood == 'moore' else 'NN'}"
+
+
+### Transition
+def _pad(m, r, boundary):
+    """
+    Add r cells around the matrices: copies of the opposite edges (torus) or dead cells (fixed).
+    """
+
+    rows, columns = m.shape[-2:]
+    if r > min(rows, columns):
+        pad = [(0, 0)] * (m.ndim - 2) + [(r, r), (r, r)]
+        return np.pad(m, pad, mode='wrap' if boundary == 'torus' else 'constant')
+
+    # Filling an empty array is faster than np.pad
+    padded = np.zeros(m.shape[:-2] + (rows + 2 * r, columns + 2 * r), dtype=m.dtype)
+    padded[..., r:r + rows, r:r + columns] = m
+    if boundary == 'torus':
+        padded[..., :r, r:r + columns] = m[..., rows - r:, :]
+        padded[..., rows + r:, r:r + columns] = m[..., :r, :]
+        padded[..., :r] = padded[..., columns:columns + r]
+        padded[..., columns + r:] = padded[..., r:2 * r]
+
+    return padded
+
+
+def neighbour_count(matrices, radius=1, neighbourhood='moore', boundary='torus'):
+    """
+    Count the living neighbours of every cell of a matrix, or of a stack of matrices (the last two axes are the rows and columns).
+    The neighbourhood is summed with separable sums of shifted slices, in 2 (2R + 1) additions for the Moore neighbourhood.
+
+    Parameters:
+        matrices (numpy.ndarray): The binary matrix, or a stack of matrices.
+        radius (int optional): Radius of the neighbourhood. Default is 1.
+        neighbourhood (str optional): 'moore' or 'von_neumann'. Default is 'moore'.
+        boundary (str optional): 'torus' (periodic boundaries) or 'fixed' (the cells outside the matrix are dead). Default is 'torus'.
+
+    Returns:
+        numpy.ndarray: The number of living neighbours of each cell, uint8 (uint16 for neighbourhoods of more than 255 cells).
+
+    Raises:
+        ValueError: If the boundary or the neighbourhood is unknown.
+    """
+
+    if boundary not in BOUNDARIES:
+        raise ValueError(f'Unknown boundary {boundary!r}, use one of {BOUNDARIES}.')
+
+    size = neighbourhood_size(radius, neighbourhood)
+    m = np.asarray(matrices).astype(np.uint8 if size < 256 else np.uint16)
+    rows, columns = m.shape[-2:]
+    r = radius
+
+    padded = _pad(m, r, boundary)
+
+    if neighbourhood == 'moore':
+        # Sum the 2r + 1 rows around each cell, then the 2r + 1 columns of these sums
+        rows_sum = padded[..., :rows, :] + padded[..., 1:1 + rows, :]
+        for i in range(2, 2 * r + 1):
+            rows_sum += padded[..., i:i + rows, :]
+
+        count = rows_sum[..., :columns] + rows_sum[..., 1:1 + columns]
+        for j in range(2, 2 * r + 1):
+            count += rows_sum[..., j:j + columns]
+
+    else:
+        # The rows at a distance d of the cell contribute their cells at a distance of at most r - d in the row:
+        # widen the sums of the rows one column at a time, and add each width to the two rows that use it
+        line = padded[..., r:r + columns].copy()
+        count = np.zeros(m.shape, dtype=m.dtype)
+        for width in range(r + 1):
+            if width:
+                line += padded[..., r - width:r - width + columns]
+                line += padded[..., r + width:r + width + columns]
+            d = r - width
+            count += line[..., r - d:r - d + rows, :]
+            if d:
+                count += line[..., r + d:r + d + rows, :]
+
+    # Do not count the cell itself
+    count -= m
+
+    return count
+
+
+def transition(matrices, rule=LIFE, boundary='torus'):
+    """
+    Update each cell of a cellular automaton (or of a stack of matrices) according to an outer-totalistic rule.
+
+    Parameters:
+        matrices (numpy.ndarray): The input binary matrix, or a stack of matrices.
+        rule (str or dict optional): The rule, as a string or read by parse_rule. Default is Conway's Game of Life 'B3/S23'.
+        boundary (str optional): 'torus' or 'fixed'. Default is 'torus'.
+
+    Returns:
+        numpy.ndarray: The updated matrix after applying the rule.
+    """
+
+    if isinstance(rule, str):
+        rule = parse_rule(rule)
+
+    m = np.asarray(matrices)
+    size = neighbourhood_size(rule['radius'], rule['neighbourhood'])
+    count = neighbour_count(m, rule['radius'], rule['neighbourhood'], boundary)
+
+    index = (size + 1) * (m == 1) + count
+
+    return lookup_table(rule)[index].astype(m.dtype)
+
+### Parse the arguments
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Apply an outer-totalistic rule to a matrix')
+    parser.add_argument("matrix", type=str, help="Path to a JSON file containing the input matrix")
+    parser.add_argument("--rule", type=str, default=LIFE, help="Rule in the B/S or Larger than Life notation. Default is 'B3/S23'")
+    parser.add_argument("--boundary", type=str, choices=BOUNDARIES, default='torus', help="Boundary of the matrix. Default is 'torus'")
+    parser.add_argument("--time", type=int, default=1, help="Number of updates. Default is 1")
+    parser.add_argument("--output", type=str, default='output.json', help="JSON file where the updated matrix is saved. Default is 'output.json'")
+    args = parser.parse_args()
+
+    with open(args.matrix, 'r') as file:
+        m = np.array(json.load(file))
+
+    rule = parse_rule(args.rule)
+    print(f"Rule: {rule_string(lookup_table(rule), rule['radius'], rule['neighbourhood'])}")
+    for t in range(args.time):
+        m = transition(m, rule, args.boundary)
+
+    with open(args.output, 'w') as file:
+        json.dump(m.tolist(), file)